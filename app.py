@@ -1,12 +1,19 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from datetime import datetime, timedelta
 import requests
+import csv
+import hashlib
+import io
 import json
 import os
-from functools import wraps
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+import threading
 import time
+from bisect import bisect_left
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
@@ -18,7 +25,64 @@ migrate = Migrate(app, db)
 
 # ExchangeRate-API configuration
 EXCHANGE_API_KEY = os.getenv('EXCHANGE_API_KEY', 'your-api-key-here')
-EXCHANGE_API_BASE = 'https://v6.exchangerate-api.com/v6'
+EXCHANGE_API_BASE = os.getenv('EXCHANGE_API_BASE', 'https://v6.exchangerate-api.com/v6')
+
+# CoinGecko API configuration (free tier)
+COINGECKO_API_BASE = os.getenv('COINGECKO_API_BASE', 'https://api.coingecko.com/api/v3')
+
+# Shared HTTP connection pool for all upstream calls
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_TIMEOUT = 5  # seconds
+
+# ECB history used as a fallback when the API is unavailable
+ECB_CURRENCY_FILE = os.getenv('ECB_CURRENCY_FILE')  # defaults to the packaged file
+ECB_RELOAD_CHECK_SECONDS = 5
+
+CRYPTO_CURRENCIES = [
+    'BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'DOGE',
+    'AVAX', 'MATIC', 'LTC', 'LINK', 'UNI', 'ATOM', 'FTM'
+]
+
+# Rates are fetched and stored against this currency only, cross rates are derived from it
+RATE_PIVOT_CURRENCY = os.getenv('RATE_PIVOT_CURRENCY', 'USD')
+
+# In-process cache of exchange rates, in front of the ExchangeRate table
+RATE_CACHE_TTL = float(os.getenv('RATE_CACHE_TTL', 300))  # seconds
+RATE_CACHE_MAX_SIZE = int(os.getenv('RATE_CACHE_MAX_SIZE', 10000))
+# Seconds an expired rate is still served while it is refreshed, 0 disables stale-while-revalidate
+RATE_CACHE_STALE_TTL = float(os.getenv('RATE_CACHE_STALE_TTL', 0))
+
+# Concurrent misses share one upstream fetch, across processes too with the database lock
+RATE_FETCH_DB_LOCK = os.getenv('RATE_FETCH_DB_LOCK', 'false').lower() in ('1', 'true', 'yes')
+RATE_FETCH_LOCK_TIMEOUT = float(os.getenv('RATE_FETCH_LOCK_TIMEOUT', 10))  # seconds
+
+# Stored rates are fetched again from the API after this age
+RATE_MAX_AGE = timedelta(hours=1)
+
+# Background refresh of the recently used pairs, so that requests never wait for the APIs
+RATE_REFRESHER = os.getenv('RATE_REFRESHER', 'false').lower() in ('1', 'true', 'yes')
+RATE_REFRESH_INTERVAL = float(os.getenv('RATE_REFRESH_INTERVAL', RATE_CACHE_TTL * 0.8))  # seconds
+CRYPTO_REFRESH_INTERVAL = float(os.getenv('CRYPTO_REFRESH_INTERVAL', 60))  # seconds
+RATE_REFRESH_PAIRS = os.getenv('RATE_REFRESH_PAIRS', '')  # e.g. "EUR:USD,BTC:USD"
+RATE_REFRESH_MAX_PAIRS = int(os.getenv('RATE_REFRESH_MAX_PAIRS', 200))
+# Pairs not requested for this many seconds are no longer refreshed
+RATE_REFRESH_PAIR_TTL = float(os.getenv('RATE_REFRESH_PAIR_TTL', 86400))
+RATE_REFRESH_JITTER = float(os.getenv('RATE_REFRESH_JITTER', 0.1))  # fraction of the interval
+
+# Charts and history are served from daily rates per pair, built once and downsampled per window
+SERIES_WINDOWS = (7, 14, 30, 365)  # days
+SERIES_MAX_POINTS = int(os.getenv('SERIES_MAX_POINTS', 60))  # per window
+SERIES_INDEX_TTL = float(os.getenv('SERIES_INDEX_TTL', RATE_CACHE_TTL))  # seconds
+SERIES_INDEX_MAX_PAIRS = int(os.getenv('SERIES_INDEX_MAX_PAIRS', 1000))
+
+# Portfolios are served by pages, with the totals per currency of each user cached until they change
+PORTFOLIO_PAGE_SIZE = int(os.getenv('PORTFOLIO_PAGE_SIZE', 100))
+PORTFOLIO_MAX_PAGE_SIZE = 1000
+PORTFOLIO_CACHE_TTL = float(os.getenv('PORTFOLIO_CACHE_TTL', 60))  # seconds, in other processes
+
+# Bulk conversions are streamed, with the rate of each pair and date looked up once per request
+BULK_CONVERT_CHUNK_SIZE = int(os.getenv('BULK_CONVERT_CHUNK_SIZE', 1000))  # results per chunk
+BULK_CONVERT_MAX_RATES = int(os.getenv('BULK_CONVERT_MAX_RATES', 10000))  # pairs and dates kept
 
 class Currency(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -84,22 +148,656 @@ class CurrencyAlert(db.Model):
     
     __table_args__ = (db.Index('idx_user_alerts', 'user_id', 'is_active'),)
 
-def get_crypto_rate(crypto_currency, fiat_currency='USD'):
-    """Get cryptocurrency exchange rate"""
+class FetchLock(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+class SharedConverter:
+    """Process-wide CurrencyConverter, built lazily and reloaded when its data file changes.
+
+    It is safe to use from several threads, and ``ready`` is set once a
+    converter is loaded. When NumPy is installed, the rates are memory mapped
+    from a snapshot so that all gunicorn workers share the same memory.
+    """
+
+    def __init__(self, currency_file=None, check_interval=ECB_RELOAD_CHECK_SECONDS):
+        from currency_converter.currency_converter import CURRENCY_FILE
+        self.currency_file = currency_file or CURRENCY_FILE
+        self.check_interval = check_interval
+        self.ready = threading.Event()
+        self.loaded_at = None
+        self._converter = None
+        self._mtime = None
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def _build(self):
+        """Load a new converter from the data file"""
+        from currency_converter.currency_converter import ArrayCurrencyConverter, CurrencyConverter
+        try:
+            return ArrayCurrencyConverter(self.currency_file, mmap=True)
+        except ImportError:  # NumPy is not installed
+            return CurrencyConverter(self.currency_file)
+
+    def _is_stale(self):
+        """Check the data file modification time, at most every check_interval seconds"""
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        try:
+            return os.path.getmtime(self.currency_file) != self._mtime
+        except OSError:
+            return False  # keep serving the loaded rates
+
+    def get(self):
+        """Return the shared converter, loading or reloading it if needed"""
+        converter = self._converter
+        if converter is not None and not self._is_stale():
+            return converter
+
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.currency_file)
+            except OSError:
+                if self._converter is None:
+                    raise
+                return self._converter  # keep serving the loaded rates
+
+            if self._converter is None or mtime != self._mtime:
+                self._converter = self._build()
+                self._mtime = mtime
+                self.loaded_at = datetime.utcnow()
+                self.ready.set()
+            return self._converter
+
+    def warm_up(self):
+        """Load the converter in a background thread if it is not loaded yet"""
+        if not self.ready.is_set() and not self._lock.locked():
+            threading.Thread(target=self.get, daemon=True).start()
+
+shared_converter = SharedConverter(ECB_CURRENCY_FILE)
+
+class RateCache:
+    """Thread-safe LRU cache of rates, with a time to live per entry.
+
+    With ``stale_ttl`` > 0, expired entries are still returned as stale for
+    that many seconds, so that callers can refresh them in the background
+    instead of waiting (stale-while-revalidate).
+    """
+
+    def __init__(
+        self, ttl=RATE_CACHE_TTL, max_size=RATE_CACHE_MAX_SIZE, stale_ttl=RATE_CACHE_STALE_TTL
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (value, is_fresh) for a cached key, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value, True
+                if now < expires_at + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    return value, False
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Cache a value, evicting the least recently used entries if full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key=None):
+        """Remove one key, or all keys if none is given"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def start_refresh(self, key):
+        """Return True if the caller should refresh the key, False if already being refreshed"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+            }
+
+rate_cache = RateCache()
+
+class SingleFlight:
+    """Run a function once for concurrent calls with the same key, and share its result"""
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, *args):
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._in_flight[key] = Future()
+        
+        if is_leader:
+            try:
+                future.set_result(function(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+        
+        return future.result()
+
+class HttpClient:
+    """Keep-alive HTTP client shared by all upstream calls.
+
+    Connections are pooled per host, and concurrent requests for the same URL
+    are coalesced into one. Tests can point the API base URLs to a local stub
+    server, or replace ``http_client``.
+    """
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT):
+        from requests.adapters import HTTPAdapter
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._requests = SingleFlight()
+
+    def _get_json(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_json(self, url):
+        """GET a JSON document, raising for HTTP errors"""
+        return self._requests.do(url, self._get_json, url)
+
+http_client = HttpClient()
+rate_fetches = SingleFlight()
+
+class DatabaseLock:
+    """Lock shared by all processes using the database, expiring after a timeout.
+
+    Used so that only one worker calls the upstream API for the same data.
+    """
+
+    table_created = False  # in this process, for databases created before the lock table
+
+    def __init__(self, name, timeout=RATE_FETCH_LOCK_TIMEOUT, poll_interval=0.1):
+        self.name = name
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    @classmethod
+    def create_table(cls):
+        """Create the lock table if it does not exist yet, once per process"""
+        if cls.table_created:
+            return
+        try:
+            FetchLock.__table__.create(db.engine, checkfirst=True)
+        except Exception:
+            # Created by another process meanwhile
+            if not db.inspect(db.engine).has_table(FetchLock.__tablename__):
+                raise
+        cls.table_created = True
+
+    def acquire(self):
+        """Take the lock if it is free or expired, without waiting"""
+        self.create_table()
+        now = datetime.utcnow()
+        try:
+            FetchLock.query.filter(
+                FetchLock.name == self.name, FetchLock.expires_at < now
+            ).delete()
+            db.session.add(FetchLock(
+                name=self.name, expires_at=now + timedelta(seconds=self.timeout)
+            ))
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            return False
+
+    def release(self):
+        FetchLock.query.filter_by(name=self.name).delete()
+        db.session.commit()
+
+    def is_free(self):
+        """Whether the lock is released or expired.
+
+        Read on a connection of its own, to see the commits of the other processes.
+        """
+        self.create_table()
+        with db.engine.connect() as connection:
+            expires_at = connection.execute(
+                db.select(FetchLock.expires_at).where(FetchLock.name == self.name)
+            ).scalar()
+        return expires_at is None or expires_at < datetime.utcnow()
+
+    def wait(self):
+        """Wait until the lock is released or expired, return False on timeout"""
+        # The lock expires at most timeout after now, check once more after that
+        deadline = time.monotonic() + self.timeout + self.poll_interval
+        while time.monotonic() < deadline:
+            if self.is_free():
+                return True
+            time.sleep(self.poll_interval)
+        return self.is_free()
+
+class RateRefresher:
+    """Background thread refreshing the rates of the recently used pairs before they expire.
+
+    The pairs are learned from the requests served (see ``record``), in
+    addition to the configured ones. Each job runs at its own interval with
+    random jitter, and retries with exponential backoff while it fails.
+    """
+
+    def __init__(self, pairs=(), max_pairs=RATE_REFRESH_MAX_PAIRS,
+                 pair_ttl=RATE_REFRESH_PAIR_TTL, jitter=RATE_REFRESH_JITTER, retry_delay=5):
+        self.configured_pairs = list(pairs)
+        self.max_pairs = max_pairs
+        self.pair_ttl = pair_ttl
+        self.jitter = jitter
+        self.retry_delay = retry_delay
+        self.jobs = []
+        self._pairs = OrderedDict()  # pair -> last requested
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._pid = None
+
+    def add_job(self, name, function, interval):
+        """Run function(pairs) every interval seconds"""
+        self.jobs.append({
+            'name': name,
+            'function': function,
+            'interval': interval,
+            'next_run': 0.0,
+            'failures': 0,
+            'last_success': None,
+            'last_error': None
+        })
+
+    def record(self, pair):
+        """Remember a requested pair, forgetting the least recently requested ones if full"""
+        with self._lock:
+            self._pairs[pair] = time.monotonic()
+            self._pairs.move_to_end(pair)
+            while len(self._pairs) > self.max_pairs:
+                self._pairs.popitem(last=False)
+
+    def pairs(self):
+        """Configured pairs and pairs requested within pair_ttl"""
+        oldest = time.monotonic() - self.pair_ttl
+        with self._lock:
+            while self._pairs and next(iter(self._pairs.values())) < oldest:
+                self._pairs.popitem(last=False)
+            recent = list(self._pairs)
+        return list(dict.fromkeys(self.configured_pairs + recent))
+
+    def next_delay(self, job):
+        """Seconds until the next run of a job, backing off while it fails"""
+        import random
+        delay = job['interval']
+        if job['failures']:
+            delay = min(delay, self.retry_delay * 2 ** (job['failures'] - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def run_pending(self):
+        """Run the jobs that are due, and return the seconds until the next one is"""
+        pairs = self.pairs()
+        for job in self.jobs:
+            if job['next_run'] > time.monotonic():
+                continue
+            try:
+                with app.app_context():
+                    job['function'](pairs)
+                job['failures'] = 0
+                job['last_success'] = datetime.utcnow().isoformat()
+            except Exception as e:
+                job['failures'] += 1
+                job['last_error'] = str(e)
+                print(f"Rate refresher error in {job['name']}: {e}")
+            job['next_run'] = time.monotonic() + self.next_delay(job)
+        
+        if not self.jobs:
+            return self.retry_delay
+        return max(0.0, min(job['next_run'] for job in self.jobs) - time.monotonic())
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            self._stop.wait(self.run_pending())
+
+    def ensure_started(self):
+        """Start the refresher thread, once in each process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            threading.Thread(target=self.run_forever, name='rate-refresher', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        self._pid = None
+
+    def stats(self):
+        return {
+            'running': self._pid == os.getpid(),
+            'pairs': len(self.pairs()),
+            'jobs': [
+                {key: value for key, value in job.items() if key not in ('function', 'next_run')}
+                for job in self.jobs
+            ]
+        }
+
+rate_refresher = RateRefresher(
+    tuple(pair.strip().upper().split(':')) for pair in RATE_REFRESH_PAIRS.split(',') if pair.strip()
+)
+
+class SeriesIndex:
+    """Daily rates of currency pairs, downsampled for each chart window, with an ETag.
+
+    The daily rates come from the ECB history of the shared converter, and from
+    the stored pivot rates, the last one of each day replacing the ECB rate.
+    Each pair is built once with its windows, then served from memory until it
+    expires, new rates are stored or the converter is reloaded.
+    """
+
+    def __init__(self, windows=SERIES_WINDOWS, max_points=SERIES_MAX_POINTS,
+                 ttl=SERIES_INDEX_TTL, max_pairs=SERIES_INDEX_MAX_PAIRS):
+        self.windows = windows
+        self.max_points = max_points
+        self._cache = RateCache(ttl=ttl, max_size=max_pairs, stale_ttl=0)
+    
+    def window(self, days):
+        """Smallest window of at least that many days, or the largest one"""
+        for window in self.windows:
+            if days <= window:
+                return window
+        return self.windows[-1]
+    
+    def get(self, from_currency, to_currency, days):
+        """Return (points, etag) for the window of the given days.
+
+        The points are (date, rate) tuples, ending at the last known rate.
+        """
+        try:
+            converter = shared_converter.get()
+        except Exception as e:
+            print(f"ECB Series Error: {e}")
+            converter = None
+        
+        key = (from_currency, to_currency)
+        cached = self._cache.get(key)
+        if cached is None or cached[0]['converter'] is not converter:
+            entry = {
+                'converter': converter,
+                'windows': self._build(from_currency, to_currency, converter)
+            }
+            self._cache.set(key, entry)
+        else:
+            entry = cached[0]
+        return entry['windows'][self.window(days)]
+    
+    def invalidate(self):
+        self._cache.invalidate()
+    
+    def stats(self):
+        return self._cache.stats()
+    
+    def _build(self, from_currency, to_currency, converter):
+        """Daily rates of a pair, as (points, etag) per window"""
+        daily = self._daily_rates(from_currency, to_currency, converter)
+        days = sorted(daily)
+        
+        offsets = {}  # days before the last day
+        if days:
+            last_day = datetime.strptime(days[-1], '%Y-%m-%d')
+            offsets = {day: (last_day - datetime.strptime(day, '%Y-%m-%d')).days for day in days}
+        
+        windows = {}
+        for window in self.windows:
+            step = -(-window // self.max_points)  # days per point, rounded up
+            # The last rate of each step of the window, counted back from the last day
+            buckets = {}
+            for day in days:
+                if offsets[day] < window:
+                    buckets[offsets[day] // step] = day
+            points = [(day, daily[day]) for day in sorted(buckets.values())]
+            content = json.dumps([from_currency, to_currency, window, points])
+            windows[window] = (points, hashlib.sha1(content.encode()).hexdigest())
+        return windows
+    
+    def _daily_rates(self, from_currency, to_currency, converter):
+        """Rates of a pair over the largest window, as a {'%Y-%m-%d': rate} dict"""
+        max_days = self.windows[-1]
+        daily = {}
+        
+        if converter is not None and {from_currency, to_currency} <= converter.currencies:
+            last_date = min(converter.bounds[c].last_date for c in (from_currency, to_currency))
+            dates, rates = converter.series(
+                from_currency, to_currency, start=last_date - timedelta(days=max_days - 1)
+            )
+            for day, rate in zip(dates, rates):
+                daily[str(day)] = round(float(rate), 6)
+        
+        since = datetime.utcnow() - timedelta(days=max_days)
+        for timestamp, rate in get_cross_rate_history(from_currency, to_currency, since):
+            daily[timestamp.strftime('%Y-%m-%d')] = round(rate, 6)
+        
+        return daily
+
+series_index = SeriesIndex()
+portfolio_totals = RateCache(ttl=PORTFOLIO_CACHE_TTL, max_size=RATE_CACHE_MAX_SIZE, stale_ttl=0)
+
+class AlertEngine:
+    """Active currency alerts, grouped by pair and type and sorted by target rate.
+
+    The alerts of a pair are kept sorted so that the next ones to trigger are
+    last: a bisect finds all the alerts crossed by a new rate, and they are
+    removed from the end, so an evaluation costs as much as the alerts it
+    triggers. Alerts created since the last sync are loaded by id.
+
+    The alerts are read and updated on connections of their own, so that the
+    session of the caller is left untouched.
+    """
+
+    def __init__(self, update_chunk_size=500):
+        self.update_chunk_size = update_chunk_size  # ids per UPDATE, below the SQLite limit
+        self.triggered = 0
+        self._alerts = {}  # (pair, alert_type) -> (keys, ids), keys sorted ascending
+        self._last_id = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(alert_type, rate):
+        """Sort key of a rate, so that the alerts crossed by a rate have keys >= its key"""
+        return -rate if alert_type == 'above' else rate
+    
+    def sync(self):
+        """Load the active alerts created since the last sync"""
+        query = db.select(
+            CurrencyAlert.id,
+            CurrencyAlert.from_currency,
+            CurrencyAlert.to_currency,
+            CurrencyAlert.target_rate,
+            CurrencyAlert.alert_type
+        ).filter(CurrencyAlert.id > self._last_id).filter_by(is_active=True)
+        with db.engine.connect() as connection:
+            rows = connection.execute(query.order_by(CurrencyAlert.id)).all()
+        
+        new_alerts = {}
+        for alert_id, from_currency, to_currency, target_rate, alert_type in rows:
+            self._last_id = alert_id
+            if alert_type in ('above', 'below'):
+                new_alerts.setdefault(((from_currency, to_currency), alert_type), []).append(
+                    (self._key(alert_type, target_rate), alert_id)
+                )
+        
+        with self._lock:
+            for group, alerts in new_alerts.items():
+                keys, ids = self._alerts.get(group, ([], []))
+                alerts = list(zip(keys, ids)) + alerts
+                alerts.sort()  # merges the two sorted runs
+                self._alerts[group] = (
+                    [key for key, _ in alerts], [alert_id for _, alert_id in alerts]
+                )
+    
+    def pairs(self):
+        """Pairs having active alerts"""
+        with self._lock:
+            return list(dict.fromkeys(pair for pair, _ in self._alerts))
+    
+    def evaluate(self, rates):
+        """Trigger the alerts crossed by the given {pair: rate}, and return their ids"""
+        triggered = []
+        with self._lock:
+            for pair, rate in rates.items():
+                for alert_type in ('above', 'below'):
+                    group = self._alerts.get((pair, alert_type))
+                    if group is None:
+                        continue
+                    keys, ids = group
+                    i = bisect_left(keys, self._key(alert_type, rate))
+                    triggered.extend(ids[i:])
+                    del keys[i:], ids[i:]
+                    if not keys:
+                        del self._alerts[pair, alert_type]
+        
+        if triggered:
+            now = datetime.utcnow()
+            with db.engine.begin() as connection:
+                for start in range(0, len(triggered), self.update_chunk_size):
+                    connection.execute(db.update(CurrencyAlert).where(
+                        CurrencyAlert.id.in_(triggered[start:start + self.update_chunk_size])
+                    ).filter_by(is_active=True).values(is_active=False, triggered_at=now))
+            self.triggered += len(triggered)
+        return triggered
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'pairs': len({pair for pair, _ in self._alerts}),
+                'active': sum(len(keys) for keys, _ in self._alerts.values()),
+                'triggered': self.triggered
+            }
+
+alert_engine = AlertEngine()
+
+def check_alerts(get_rate):
+    """Trigger the alerts crossed by new rates, get_rate(pair) giving the rate of a pair or None.
+
+    Called when rates are refreshed, not when they are read by a request.
+    """
+    try:
+        alert_engine.sync()
+        rates = {pair: get_rate(pair) for pair in alert_engine.pairs()}
+        alert_engine.evaluate({pair: rate for pair, rate in rates.items() if rate is not None})
+    except Exception as e:
+        print(f"Alert Error: {e}")
+
+def get_crypto_rates(crypto_currencies, fiat_currency='USD'):
+    """Get the exchange rates of several cryptocurrencies with one call, as a dict"""
+    rates = {}
     try:
-        # Using CoinGecko API (free tier)
-        url = f"https://api.coingecko.com/api/v3/simple/price?ids={crypto_currency.lower()}&vs_currencies={fiat_currency.lower()}"
-        response = requests.get(url, timeout=5)
+        crypto_ids = ','.join(sorted({c.lower() for c in crypto_currencies}))
+        vs_currency = fiat_currency.lower()
+        url = f"{COINGECKO_API_BASE}/simple/price?ids={crypto_ids}&vs_currencies={vs_currency}"
+        data = http_client.get_json(url)
         
-        if response.status_code == 200:
-            data = response.json()
+        for crypto_currency in crypto_currencies:
             crypto_id = crypto_currency.lower()
             if crypto_id in data and fiat_currency.lower() in data[crypto_id]:
-                return data[crypto_id][fiat_currency.lower()]
+                rates[crypto_currency] = data[crypto_id][fiat_currency.lower()]
     except Exception as e:
         print(f"Crypto API Error: {e}")
     
-    return None
+    return rates
+
+def get_crypto_pair_rates(pairs):
+    """Rates of pairs involving a cryptocurrency, as a dict, with one API call per fiat currency"""
+    crypto_currencies = CRYPTO_CURRENCIES
+    wanted = {}  # fiat currency -> cryptocurrencies
+    
+    for from_currency, to_currency in pairs:
+        if from_currency in crypto_currencies and to_currency in crypto_currencies:
+            # Crypto to Crypto (via USD)
+            wanted.setdefault('USD', set()).update((from_currency, to_currency))
+        elif from_currency in crypto_currencies:
+            wanted.setdefault(to_currency, set()).add(from_currency)
+        elif to_currency in crypto_currencies:
+            wanted.setdefault(from_currency, set()).add(to_currency)
+    
+    prices = {
+        fiat: get_crypto_rates(sorted(cryptos), fiat) for fiat, cryptos in wanted.items()
+    }
+    
+    rates = {}
+    for from_currency, to_currency in pairs:
+        if from_currency in crypto_currencies and to_currency in crypto_currencies:
+            from_rate = prices['USD'].get(from_currency)
+            to_rate = prices['USD'].get(to_currency)
+            if from_rate and to_rate:
+                rates[from_currency, to_currency] = to_rate / from_rate
+        elif from_currency in crypto_currencies:
+            # Crypto to Fiat
+            crypto_rate = prices[to_currency].get(from_currency)
+            if crypto_rate:
+                rates[from_currency, to_currency] = crypto_rate
+        elif to_currency in crypto_currencies:
+            # Fiat to Crypto
+            crypto_rate = prices[from_currency].get(to_currency)
+            if crypto_rate:
+                rates[from_currency, to_currency] = 1.0 / crypto_rate
+    
+    return rates
 
 def get_exchange_rate(from_currency, to_currency):
     """Get accurate exchange rate with proper fallback system"""
@@ -107,105 +805,438 @@ def get_exchange_rate(from_currency, to_currency):
     if from_currency == to_currency:
         return 1.0
     
-    # Handle cryptocurrency conversions
-    crypto_currencies = ['BTC', 'ETH', 'BNB', 'ADA', 'SOL', 'XRP', 'DOT', 'DOGE', 'AVAX', 'MATIC', 'LTC', 'LINK', 'UNI', 'ATOM', 'FTM']
+    key = (from_currency, to_currency)
+    rate_refresher.record(key)
     
-    if from_currency in crypto_currencies and to_currency not in crypto_currencies:
-        # Crypto to Fiat
-        crypto_rate = get_crypto_rate(from_currency, to_currency)
+    # Handle cryptocurrency conversions
+    if from_currency in CRYPTO_CURRENCIES or to_currency in CRYPTO_CURRENCIES:
+        # Only cached when kept fresh by the background refresher
+        cached = rate_cache.get(key)
+        if cached is not None and cached[1]:
+            return cached[0]
+        
+        crypto_rate = get_crypto_pair_rates([key]).get(key)
         if crypto_rate:
             return crypto_rate
-    elif to_currency in crypto_currencies and from_currency not in crypto_currencies:
-        # Fiat to Crypto
-        crypto_rate = get_crypto_rate(to_currency, from_currency)
-        if crypto_rate:
-            return 1.0 / crypto_rate
-    elif from_currency in crypto_currencies and to_currency in crypto_currencies:
-        # Crypto to Crypto (via USD)
-        from_rate = get_crypto_rate(from_currency, 'USD')
-        to_rate = get_crypto_rate(to_currency, 'USD')
-        if from_rate and to_rate:
-            return to_rate / from_rate
     
-    # Check if we have recent data (within 1 hour for accuracy)
-    recent_rate = ExchangeRate.query.filter(
-        ExchangeRate.from_currency == from_currency,
-        ExchangeRate.to_currency == to_currency,
-        ExchangeRate.timestamp >= datetime.utcnow() - timedelta(hours=1)
-    ).order_by(ExchangeRate.timestamp.desc()).first()
+    cached = rate_cache.get(key)
+    if cached is not None:
+        rate, is_fresh = cached
+        if not is_fresh:
+            refresh_rate_in_background(from_currency, to_currency)
+        return rate
     
-    if recent_rate:
-        return recent_rate.rate
+    # Concurrent misses for the same pair wait for one fetch
+    rate = rate_fetches.do(key, fetch_exchange_rate, from_currency, to_currency)
+    if rate is None:
+        return 1.0
     
-    # Try API first for real-time rates
-    try:
-        url = f"{EXCHANGE_API_BASE}/{EXCHANGE_API_KEY}/pair/{from_currency}/{to_currency}"
-        response = requests.get(url, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('result') == 'success':
-                rate = data.get('conversion_rate')
-                
-                # Store in database
-                exchange_rate = ExchangeRate(
-                    from_currency=from_currency,
-                    to_currency=to_currency,
-                    rate=rate
-                )
-                db.session.add(exchange_rate)
-                db.session.commit()
-                
-                return rate
-    except Exception as e:
-        print(f"API Error: {e}")
+    rate_cache.set(key, rate)
+    return rate
+
+def refresh_rate_in_background(from_currency, to_currency):
+    """Refresh a cached rate in a background thread, unless it is already being refreshed"""
+    key = (from_currency, to_currency)
+    if not rate_cache.start_refresh(key):
+        return
     
-    # Primary fallback to original currency converter
-    try:
-        from currency_converter.currency_converter import CurrencyConverter
-        converter = CurrencyConverter()
-        result = converter.convert(1, from_currency, to_currency)
-        
-        # Store in database
-        exchange_rate = ExchangeRate(
-            from_currency=from_currency,
-            to_currency=to_currency,
-            rate=result
+    def refresh():
+        try:
+            with app.app_context():
+                rate = fetch_exchange_rate(from_currency, to_currency)
+            if rate is not None:
+                rate_cache.set(key, rate)
+        except Exception as e:
+            print(f"Rate refresh error: {e}")
+        finally:
+            rate_cache.end_refresh(key)
+    
+    threading.Thread(target=refresh, daemon=True).start()
+
+def get_pivot_rates(currencies=None, since=None):
+    """Latest stored pivot rates of the given currencies (default: all), as a dict, in one query"""
+    latest = db.session.query(
+        ExchangeRate.to_currency,
+        db.func.max(ExchangeRate.timestamp).label('timestamp')
+    ).filter(ExchangeRate.from_currency == RATE_PIVOT_CURRENCY)
+    if currencies is not None:
+        latest = latest.filter(ExchangeRate.to_currency.in_(set(currencies)))
+    if since is not None:
+        latest = latest.filter(ExchangeRate.timestamp >= since)
+    latest = latest.group_by(ExchangeRate.to_currency).subquery()
+    
+    rows = ExchangeRate.query.join(latest, db.and_(
+        ExchangeRate.to_currency == latest.c.to_currency,
+        ExchangeRate.timestamp == latest.c.timestamp
+    )).filter(ExchangeRate.from_currency == RATE_PIVOT_CURRENCY)
+    
+    return {row.to_currency: row.rate for row in rows}
+
+def store_pivot_rates(rates):
+    """Store rates from the pivot currency, one row per currency, and cache them"""
+    now = datetime.utcnow()
+    db.session.add_all([
+        ExchangeRate(
+            from_currency=RATE_PIVOT_CURRENCY,
+            to_currency=currency,
+            rate=rate,
+            timestamp=now
         )
-        db.session.add(exchange_rate)
-        db.session.commit()
-        
-        return result
-    except Exception as e:
-        print(f"Primary Fallback Error: {e}")
+        for currency, rate in rates.items() if currency != RATE_PIVOT_CURRENCY
+    ])
+    db.session.commit()
+    
+    for currency, rate in rates.items():
+        rate_cache.set((RATE_PIVOT_CURRENCY, currency), rate)
+    series_index.invalidate()
+
+def fetch_pivot_rates():
+    """Fetch the rates of all currencies against the pivot currency with one API call"""
+    url = f"{EXCHANGE_API_BASE}/{EXCHANGE_API_KEY}/latest/{RATE_PIVOT_CURRENCY}"
+    data = http_client.get_json(url)
+    
+    if data.get('result') == 'success':
+        rates = data.get('conversion_rates', {})
+        store_pivot_rates(rates)
+        check_alerts(lambda pair: cross_rate(rates, *pair))
+        return rates
+    
+    return {}
+
+def fetch_pivot_rates_once():
+    """Fetch the pivot rates, once for all concurrent callers in this process.
+
+    With RATE_FETCH_DB_LOCK, only one process calls the API, and the other ones
+    wait for it and read the rates it stored.
+    """
+    if not RATE_FETCH_DB_LOCK:
+        return rate_fetches.do(RATE_PIVOT_CURRENCY, fetch_pivot_rates)
+    return rate_fetches.do(RATE_PIVOT_CURRENCY, fetch_pivot_rates_with_lock)
+
+def fetch_pivot_rates_with_lock():
+    """Fetch the pivot rates while holding the database lock, or wait for the process holding it"""
+    lock = DatabaseLock(f'pivot-rates-{RATE_PIVOT_CURRENCY}')
+    if not lock.acquire():
+        if lock.wait():
+            recent_rates = get_pivot_rates(since=datetime.utcnow() - RATE_MAX_AGE)
+            if recent_rates:
+                return recent_rates
+        if not lock.acquire():
+            return {}
     
-    # Secondary fallback: try reverse conversion
     try:
-        from currency_converter.currency_converter import CurrencyConverter
-        converter = CurrencyConverter()
-        reverse_result = converter.convert(1, to_currency, from_currency)
-        result = 1.0 / reverse_result if reverse_result != 0 else 1.0
-        
-        # Store in database
-        exchange_rate = ExchangeRate(
-            from_currency=from_currency,
-            to_currency=to_currency,
-            rate=result
-        )
-        db.session.add(exchange_rate)
-        db.session.commit()
-        
-        return result
-    except Exception as e:
-        print(f"Secondary Fallback Error: {e}")
+        return fetch_pivot_rates()
+    finally:
+        lock.release()
+
+def cross_rate(pivot_rates, from_currency, to_currency):
+    """Derive a rate from the rates of both currencies against the pivot currency"""
+    pivot_rates = dict(pivot_rates, **{RATE_PIVOT_CURRENCY: 1.0})
+    from_rate = pivot_rates.get(from_currency)
+    to_rate = pivot_rates.get(to_currency)
+    
+    if from_rate and to_rate is not None:
+        return to_rate / from_rate
+    return None
+
+def get_pivot_legs(currencies):
+    """Rates from the pivot currency to each currency, from memory, the database or the API"""
+    legs = {RATE_PIVOT_CURRENCY: 1.0}
+    
+    for currency in currencies:
+        if currency in legs:
+            continue
+        cached = rate_cache.get((RATE_PIVOT_CURRENCY, currency))
+        if cached is not None:
+            legs[currency] = cached[0]
+    
+    # Check if we have recent data (within 1 hour for accuracy)
+    missing = [c for c in currencies if c not in legs]
+    if missing:
+        recent_rates = get_pivot_rates(missing, since=datetime.utcnow() - RATE_MAX_AGE)
+        for currency, rate in recent_rates.items():
+            rate_cache.set((RATE_PIVOT_CURRENCY, currency), rate)
+        legs.update(recent_rates)
+    
+    # Try API for real-time rates, one call returns all currencies
+    missing = [c for c in currencies if c not in legs]
+    if missing:
+        try:
+            legs.update(fetch_pivot_rates_once())
+        except Exception as e:
+            print(f"API Error: {e}")
+    
+    return legs
+
+def add_ecb_pivot_rates(legs, currencies):
+    """Add the missing pivot rates from the original currency converter, and store them"""
+    converter = shared_converter.get()
+    
+    ecb_legs = {}
+    for currency in currencies:
+        if currency in legs or currency not in converter.currencies:
+            continue
+        try:
+            ecb_legs[currency] = converter.convert(1, RATE_PIVOT_CURRENCY, currency)
+        except Exception as e:
+            print(f"ECB Fallback Error: {e}")
+    
+    if ecb_legs:
+        store_pivot_rates(ecb_legs)
+        legs.update(ecb_legs)
+
+def resolve_pivot_rates(currencies):
+    """Rates from the pivot currency to each currency, using every source in turn"""
+    legs = get_pivot_legs(currencies)
+    
+    # Fallback to original currency converter for the missing rates
+    if any(c not in legs for c in currencies):
+        try:
+            add_ecb_pivot_rates(legs, currencies)
+        except Exception as e:
+            print(f"ECB Fallback Error: {e}")
+    
+    # Final fallback to last known rates
+    missing = [c for c in currencies if c not in legs]
+    if missing:
+        legs.update(get_pivot_rates(missing))
+    
+    return legs
+
+def fetch_exchange_rate(from_currency, to_currency):
+    """Get a fiat exchange rate from the database, the API or the ECB data, without caching"""
+    legs = resolve_pivot_rates([from_currency, to_currency])
+    return cross_rate(legs, from_currency, to_currency)
+
+def get_pair_rates(pairs):
+    """Rates of many pairs, as a dict, with one lookup of the pivot rates and one crypto API call"""
+    rates = {}
+    fiat_pairs = []
+    crypto_pairs = []
+    
+    for pair in set(pairs):
+        rate_refresher.record(pair)
+        if pair[0] == pair[1]:
+            rates[pair] = 1.0
+        elif pair[0] in CRYPTO_CURRENCIES or pair[1] in CRYPTO_CURRENCIES:
+            cached = rate_cache.get(pair)
+            if cached is not None and cached[1]:
+                rates[pair] = cached[0]
+            else:
+                crypto_pairs.append(pair)
+        else:
+            fiat_pairs.append(pair)
+    
+    if crypto_pairs:
+        rates.update(get_crypto_pair_rates(crypto_pairs))
+    
+    if fiat_pairs:
+        currencies = sorted({currency for pair in fiat_pairs for currency in pair})
+        legs = resolve_pivot_rates(currencies)
+        for pair in fiat_pairs:
+            rate = cross_rate(legs, *pair)
+            if rate is not None:
+                rates[pair] = rate
+    
+    return rates
+
+def get_batch_rates(base_currency, target_currencies):
+    """Rates from one currency to many, by target currency"""
+    rates = get_pair_rates([(base_currency, target) for target in target_currencies])
+    return {
+        target: rates[base_currency, target]
+        for target in target_currencies if (base_currency, target) in rates
+    }
+
+def get_rates_to(currencies, to_currency):
+    """Rates from many currencies to one, by currency"""
+    rates = get_pair_rates([(currency, to_currency) for currency in currencies])
+    return {currency: rate for (currency, _), rate in rates.items()}
+
+def get_portfolio_totals(user_id):
+    """Amount, purchase value in USD and number of lots per currency of a user, in one query"""
+    cached = portfolio_totals.get(user_id)
+    if cached is not None:
+        return cached[0]
+    
+    rows = db.session.query(
+        Portfolio.currency_code,
+        db.func.sum(Portfolio.amount),
+        db.func.sum(Portfolio.amount * Portfolio.purchase_rate),
+        db.func.count(Portfolio.id)
+    ).filter(Portfolio.user_id == user_id).group_by(Portfolio.currency_code)
+    
+    totals = {
+        currency: {'amount': amount, 'purchase_value': purchase_value, 'items': items}
+        for currency, amount, purchase_value, items in rows
+    }
+    portfolio_totals.set(user_id, totals)
+    return totals
+
+def value_portfolio_item(item, current_rate):
+    """Current value and profit or loss of a portfolio lot, in USD"""
+    current_value = item.amount * current_rate if current_rate else 0
+    purchase_value = item.amount * item.purchase_rate
+    profit_loss = current_value - purchase_value
+    profit_loss_percent = (profit_loss / purchase_value * 100) if purchase_value > 0 else 0
+    
+    return {
+        'id': item.id,
+        'currency_code': item.currency_code,
+        'amount': item.amount,
+        'purchase_rate': item.purchase_rate,
+        'current_rate': current_rate,
+        'current_value_usd': round(current_value, 2),
+        'purchase_value_usd': round(purchase_value, 2),
+        'profit_loss_usd': round(profit_loss, 2),
+        'profit_loss_percent': round(profit_loss_percent, 2),
+        'purchase_date': item.purchase_date.isoformat(),
+        'notes': item.notes
+    }
+
+def numbered_csv_rows(reader):
+    """Yield (line, row) from a CSV reader, rows being numbered by their first line"""
+    line_num = 0
+    for row in reader:
+        yield line_num + 1, row
+        line_num = reader.line_num
+
+def read_bulk_records(lines, input_format):
+    """Yield (line, record, error) from CSV or NDJSON lines.
+
+    A record is (amount, from, to, date), the date being None when not given.
+    """
+    if input_format == 'csv':
+        rows = numbered_csv_rows(csv.reader(lines))
+    else:
+        rows = enumerate(lines, 1)
+    
+    for number, row in rows:
+        try:
+            if input_format == 'csv':
+                if number == 1 and row and row[0].strip().lower() == 'amount':
+                    continue  # header
+                if not row:
+                    continue
+                amount, from_currency, to_currency, date = [*row, ''][:4]
+            else:
+                if not row.strip():
+                    continue
+                data = json.loads(row)
+                amount = data.get('amount', 1)
+                from_currency = data.get('from_currency', '')
+                to_currency = data.get('to_currency', '')
+                date = data.get('date') or ''
+            
+            date = date.strip()
+            record = (
+                float(amount),
+                from_currency.strip().upper(),
+                to_currency.strip().upper(),
+                datetime.fromisoformat(date).date() if date else None
+            )
+        except (ValueError, TypeError, AttributeError) as e:
+            yield number, None, f'Invalid record: {e}'
+        else:
+            yield number, record, None
+
+def make_bulk_rate_lookup(currencies):
+    """Function returning the rate of a pair at a date, or the latest one, each looked up once"""
+    @lru_cache(maxsize=BULK_CONVERT_MAX_RATES)
+    def get_rate(from_currency, to_currency, date):
+        for currency in (from_currency, to_currency):
+            if currency not in currencies:
+                raise ValueError(f'Unsupported currency: {currency}')
+        if date is None:
+            return get_exchange_rate(from_currency, to_currency)
+        if from_currency in CRYPTO_CURRENCIES or to_currency in CRYPTO_CURRENCIES:
+            raise ValueError('Historical rates are not available for cryptocurrencies')
+        return shared_converter.get().convert(1, from_currency, to_currency, date)
     
-    # Final fallback to last known rate
-    last_rate = ExchangeRate.query.filter(
-        ExchangeRate.from_currency == from_currency,
-        ExchangeRate.to_currency == to_currency
-    ).order_by(ExchangeRate.timestamp.desc()).first()
+    return get_rate
+
+def get_cross_rate_history(from_currency, to_currency, since):
+    """List of (timestamp, rate) derived from the stored pivot rates since a date"""
+    rows = ExchangeRate.query.filter(
+        ExchangeRate.from_currency == RATE_PIVOT_CURRENCY,
+        ExchangeRate.to_currency.in_([from_currency, to_currency]),
+        ExchangeRate.timestamp >= since
+    ).order_by(ExchangeRate.timestamp.asc()).all()
+    
+    legs = {}
+    history = []
+    for row in rows:
+        legs[row.to_currency] = row.rate
+        rate = cross_rate(legs, from_currency, to_currency)
+        if rate is None:
+            continue
+        if history and history[-1][0] == row.timestamp:
+            history[-1] = (row.timestamp, rate)  # both rates stored together
+        else:
+            history.append((row.timestamp, rate))
+    
+    return history
+
+def refresh_fiat_rates(pairs):
+    """Fetch the pivot rates before they expire, cache the given fiat pairs, and check the alerts"""
+    newest = db.session.query(db.func.max(ExchangeRate.timestamp)).filter(
+        ExchangeRate.from_currency == RATE_PIVOT_CURRENCY
+    ).scalar()
+    # Refresh ahead of expiry, so that no request finds the stored rates too old
+    refresh_age = RATE_MAX_AGE - timedelta(seconds=2 * RATE_REFRESH_INTERVAL)
+    if newest is None or datetime.utcnow() - newest > refresh_age:
+        if not fetch_pivot_rates_once():
+            raise RuntimeError("No rates returned by the API")
+    
+    alert_engine.sync()
+    fiat_pairs = [
+        pair for pair in pairs
+        if pair[0] not in CRYPTO_CURRENCIES and pair[1] not in CRYPTO_CURRENCIES
+    ]
+    alert_pairs = [
+        pair for pair in alert_engine.pairs()
+        if pair[0] not in CRYPTO_CURRENCIES and pair[1] not in CRYPTO_CURRENCIES
+    ]
+    legs = get_pivot_rates(
+        {c for pair in fiat_pairs + alert_pairs for c in pair},
+        since=datetime.utcnow() - RATE_MAX_AGE
+    )
+    for currency, rate in legs.items():
+        rate_cache.set((RATE_PIVOT_CURRENCY, currency), rate)
+    for pair in fiat_pairs:
+        rate = cross_rate(legs, *pair)
+        if rate is not None:
+            rate_cache.set(pair, rate)
+    
+    # Also when the stored rates were fetched by another process
+    check_alerts(lambda pair: cross_rate(legs, *pair))
+
+def refresh_crypto_rates(pairs):
+    """Fetch and cache the rates of the given crypto pairs, and check the alerts on crypto pairs"""
+    alert_engine.sync()
+    crypto_pairs = [
+        pair for pair in pairs
+        if pair[0] in CRYPTO_CURRENCIES or pair[1] in CRYPTO_CURRENCIES
+    ]
+    alert_pairs = [
+        pair for pair in alert_engine.pairs()
+        if pair[0] in CRYPTO_CURRENCIES or pair[1] in CRYPTO_CURRENCIES
+    ]
+    if not crypto_pairs and not alert_pairs:
+        return
     
-    return last_rate.rate if last_rate else 1.0
+    rates = get_crypto_pair_rates(list(dict.fromkeys(crypto_pairs + alert_pairs)))
+    if not rates:
+        raise RuntimeError("No rates returned by the crypto API")
+    check_alerts(rates.get)
+    # Kept until shortly after the next refresh is due
+    ttl = CRYPTO_REFRESH_INTERVAL * (2 + RATE_REFRESH_JITTER)
+    for pair in crypto_pairs:
+        if pair in rates:
+            rate_cache.set(pair, rates[pair], ttl=ttl)
+
+rate_refresher.add_job('fiat', refresh_fiat_rates, RATE_REFRESH_INTERVAL)
+rate_refresher.add_job('crypto', refresh_crypto_rates, CRYPTO_REFRESH_INTERVAL)
 
 def init_currencies():
     """Initialize database with 100+ currencies"""
@@ -555,6 +1586,16 @@ def init_tax_rates():
     
     db.session.commit()
 
+@app.before_request
+def start_rate_refresher():
+    if RATE_REFRESHER:
+        rate_refresher.ensure_started()
+
+@app.cli.command('refresh-rates')
+def refresh_rates_command():
+    """Refresh the configured pairs in the foreground, as a process next to the web workers"""
+    rate_refresher.run_forever()
+
 @app.route('/')
 def index():
     return render_template('converter.html')
@@ -567,6 +1608,31 @@ def results():
 def portfolio():
     return render_template('portfolio.html')
 
+@app.route('/api/ready')
+def get_readiness():
+    """Readiness check, returns 503 until the fallback converter is loaded"""
+    if not shared_converter.ready.is_set():
+        shared_converter.warm_up()
+        return jsonify({'ready': False}), 503
+
+    return jsonify({
+        'ready': True,
+        'currency_file': shared_converter.currency_file,
+        'loaded_at': shared_converter.loaded_at.isoformat()
+    })
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Hit/miss counters and size of the in-process rate cache, and the refresher status"""
+    from currency_converter.currency_converter import cache_info
+    return jsonify(dict(
+        rate_cache.stats(),
+        refresher=rate_refresher.stats(),
+        series_index=series_index.stats(),
+        alerts=alert_engine.stats(),
+        converter_caches=cache_info()
+    ))
+
 @app.route('/api/currencies')
 def get_currencies():
     currencies = Currency.query.filter_by(is_active=True).all()
@@ -603,6 +1669,58 @@ def convert_currency():
             'error': str(e)
         }), 400
 
+@app.route('/api/convert/bulk', methods=['POST'])
+def convert_bulk():
+    """Convert a CSV or NDJSON body of (amount, from, to, date) records, streaming the results"""
+    input_format = request.args.get('format')
+    if input_format is None:
+        input_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+    output_format = request.args.get('output', input_format)
+    if input_format not in ('csv', 'ndjson') or output_format not in ('csv', 'ndjson'):
+        return jsonify({'success': False, 'error': 'Format must be csv or ndjson'}), 400
+    
+    currencies = {code for code, in Currency.query.with_entities(Currency.code)}
+    currencies.update(CRYPTO_CURRENCIES)
+    get_rate = make_bulk_rate_lookup(currencies)
+    fields = ['line', 'amount', 'from_currency', 'to_currency', 'date', 'rate', 'result', 'error']
+    
+    def generate():
+        # Lines are read from the request stream as the results are sent,
+        # so memory does not grow with the upload
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if output_format == 'csv':
+            writer.writerow(fields)
+        
+        for count, (number, record, error) in enumerate(read_bulk_records(lines, input_format), 1):
+            values = [number, None, None, None, None, None, None, error]
+            if record is not None:
+                amount, from_currency, to_currency, date = record
+                values[1:5] = amount, from_currency, to_currency, date and date.isoformat()
+                try:
+                    rate = get_rate(from_currency, to_currency, date)
+                    values[5:7] = rate, round(amount * rate, 4)
+                except Exception as e:
+                    values[7] = str(e)
+            
+            if output_format == 'csv':
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(
+                    {field: value for field, value in zip(fields, values) if value is not None}
+                ) + '\n')
+            
+            if count % BULK_CONVERT_CHUNK_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        yield buffer.getvalue()
+    
+    mimetype = 'text/csv' if output_format == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 @app.route('/api/rates/<from_currency>/<to_currency>')
 def get_rate(from_currency, to_currency):
     try:
@@ -616,80 +1734,54 @@ def get_rate(from_currency, to_currency):
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/rates/batch')
+def get_rates_batch():
+    """Rates from a base currency to a comma-separated list of targets, or to all currencies"""
+    base_currency = request.args.get('base', 'USD').upper()
+    targets = request.args.get('targets', 'all')
+    
+    try:
+        if targets == 'all':
+            target_currencies = [c.code for c in Currency.query.filter_by(is_active=True)]
+        else:
+            target_currencies = [c.strip().upper() for c in targets.split(',') if c.strip()]
+        
+        rates = get_batch_rates(base_currency, target_currencies)
+        return jsonify({
+            'base': base_currency,
+            'rates': rates,
+            'missing': [c for c in target_currencies if c not in rates],
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/api/history/<from_currency>/<to_currency>')
 def get_rate_history(from_currency, to_currency):
+    """Daily rates of a pair over the last days, downsampled for long windows"""
     days = request.args.get('days', 7, type=int)
-    since = datetime.utcnow() - timedelta(days=days)
-    
-    rates = ExchangeRate.query.filter(
-        ExchangeRate.from_currency == from_currency,
-        ExchangeRate.to_currency == to_currency,
-        ExchangeRate.timestamp >= since
-    ).order_by(ExchangeRate.timestamp.asc()).all()
-    
-    # If no historical data, generate some sample data for demo
-    if not rates:
-        from currency_converter.currency_converter import CurrencyConverter
-        try:
-            converter = CurrencyConverter()
-            base_rate = converter.convert(1, from_currency, to_currency)
-            
-            # Generate sample historical data with small variations
-            import random
-            sample_rates = []
-            for i in range(days):
-                date = datetime.utcnow() - timedelta(days=days-i-1)
-                # Add small random variation (±2%)
-                variation = random.uniform(-0.02, 0.02)
-                rate = base_rate * (1 + variation)
-                
-                sample_rates.append({
-                    'timestamp': date.isoformat(),
-                    'rate': round(rate, 4)
-                })
-            
-            return jsonify(sample_rates)
-        except:
-            pass
+    points, etag = series_index.get(from_currency, to_currency, days)
     
-    return jsonify([{
-        'timestamp': rate.timestamp.isoformat(),
-        'rate': rate.rate
-    } for rate in rates])
+    response = jsonify([{
+        'timestamp': day,
+        'rate': rate
+    } for day, rate in points])
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 @app.route('/api/chart-data/<from_currency>/<to_currency>')
 def get_chart_data(from_currency, to_currency):
-    """Get data formatted for Chart.js with maximum performance"""
+    """Get data formatted for Chart.js, from the series index"""
     days = request.args.get('days', 7, type=int)
+    points, etag = series_index.get(from_currency, to_currency, days)
     
-    # Ultra-fast static data generation (no API calls)
-    import random
-    labels = []
-    data = []
-    
-    # Use cached rate if available, otherwise use static values
-    try:
-        recent_rate = ExchangeRate.query.filter(
-            ExchangeRate.from_currency == from_currency,
-            ExchangeRate.to_currency == to_currency
-        ).order_by(ExchangeRate.timestamp.desc()).first()
-        
-        base_rate = recent_rate.rate if recent_rate else 1.0
-    except:
-        base_rate = 1.0
-    
-    for i in range(days):
-        labels.append(f'{i+1}D')
-        # Very small variation for smooth line
-        variation = random.uniform(-0.005, 0.005)
-        rate = base_rate * (1 + variation)
-        data.append(round(rate, 4))
-    
-    return jsonify({
-        'labels': labels,
-        'data': data,
-        'current_rate': base_rate
+    response = jsonify({
+        'labels': [day for day, _ in points],
+        'data': [rate for _, rate in points],
+        'current_rate': points[-1][1] if points else None
     })
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 @app.route('/api/tax-rates/<currency_code>')
 def get_tax_rates(currency_code):
@@ -817,40 +1909,40 @@ def get_countries():
 
 @app.route('/api/portfolio/<user_id>')
 def get_portfolio(user_id):
-    """Get user's currency portfolio"""
+    """Get one page of a user's currency portfolio, and the totals of all of it"""
     try:
-        portfolio_items = Portfolio.query.filter_by(user_id=user_id).all()
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = request.args.get('per_page', PORTFOLIO_PAGE_SIZE, type=int)
+        per_page = min(max(per_page, 1), PORTFOLIO_MAX_PAGE_SIZE)
+        
+        # One rate per currency, resolved together, whatever the number of lots
+        totals = get_portfolio_totals(user_id)
+        rates = get_rates_to(list(totals), 'USD')
         
-        portfolio_data = []
         total_value_usd = 0
+        total_purchase_value_usd = 0
+        total_items = 0
+        for currency, total in totals.items():
+            total_value_usd += total['amount'] * rates.get(currency, 0)
+            total_purchase_value_usd += total['purchase_value']
+            total_items += total['items']
         
-        for item in portfolio_items:
-            current_rate = get_exchange_rate(item.currency_code, 'USD')
-            current_value = item.amount * current_rate if current_rate else 0
-            purchase_value = item.amount * item.purchase_rate
-            profit_loss = current_value - purchase_value
-            profit_loss_percent = (profit_loss / purchase_value * 100) if purchase_value > 0 else 0
-            
-            portfolio_data.append({
-                'id': item.id,
-                'currency_code': item.currency_code,
-                'amount': item.amount,
-                'purchase_rate': item.purchase_rate,
-                'current_rate': current_rate,
-                'current_value_usd': round(current_value, 2),
-                'purchase_value_usd': round(purchase_value, 2),
-                'profit_loss_usd': round(profit_loss, 2),
-                'profit_loss_percent': round(profit_loss_percent, 2),
-                'purchase_date': item.purchase_date.isoformat(),
-                'notes': item.notes
-            })
-            
-            total_value_usd += current_value
+        items = Portfolio.query.filter_by(user_id=user_id).order_by(Portfolio.id).offset(
+            (page - 1) * per_page
+        ).limit(per_page).all()
+        portfolio_data = [
+            value_portfolio_item(item, rates.get(item.currency_code)) for item in items
+        ]
         
         return jsonify({
             'portfolio': portfolio_data,
             'total_value_usd': round(total_value_usd, 2),
-            'total_items': len(portfolio_data)
+            'total_purchase_value_usd': round(total_purchase_value_usd, 2),
+            'total_profit_loss_usd': round(total_value_usd - total_purchase_value_usd, 2),
+            'total_items': total_items,
+            'page': page,
+            'per_page': per_page,
+            'pages': -(-total_items // per_page)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -879,6 +1971,7 @@ def add_portfolio_item():
         
         db.session.add(portfolio_item)
         db.session.commit()
+        portfolio_totals.invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -893,21 +1986,22 @@ def get_crypto_trends():
     """Get cryptocurrency market trends"""
     try:
         crypto_currencies = ['bitcoin', 'ethereum', 'binancecoin', 'cardano', 'solana', 'ripple']
-        url = f"https://api.coingecko.com/api/v3/simple/price?ids={','.join(crypto_currencies)}&vs_currencies=usd&include_24hr_change=true"
+        url = (
+            f"{COINGECKO_API_BASE}/simple/price?ids={','.join(crypto_currencies)}"
+            "&vs_currencies=usd&include_24hr_change=true"
+        )
         
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            
-            trends = []
-            for crypto_id, crypto_data in data.items():
-                trends.append({
-                    'symbol': crypto_id.upper(),
-                    'price_usd': crypto_data.get('usd', 0),
-                    'change_24h': crypto_data.get('usd_24h_change', 0)
-                })
-            
-            return jsonify(trends)
+        data = http_client.get_json(url)
+        
+        trends = []
+        for crypto_id, crypto_data in data.items():
+            trends.append({
+                'symbol': crypto_id.upper(),
+                'price_usd': crypto_data.get('usd', 0),
+                'change_24h': crypto_data.get('usd_24h_change', 0)
+            })
+        
+        return jsonify(trends)
     except Exception as e:
         print(f"Crypto trends error: {e}")
     
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""Benchmark the loading of rates files, or the startup of the command line.
+
+Usage: python benchmark.py [--repeat N] [--startup] [currency_file]
+"""
+
+import argparse
+from importlib.util import find_spec
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from currency_converter import CURRENCY_FILE, ArrayCurrencyConverter, CurrencyConverter
+
+
+def measure(function, repeat):
+    """Median duration in seconds, and peak memory allocated in bytes."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return statistics.median(durations), peak
+
+
+def bench_load(currency_file, repeat):
+    cases = [
+        ("CurrencyConverter", lambda: CurrencyConverter(currency_file)),
+        (
+            "CurrencyConverter, interpolation",
+            lambda: CurrencyConverter(currency_file, fallback_on_missing_rate=True),
+        ),
+        (
+            "CurrencyConverter, decimal",
+            lambda: CurrencyConverter(currency_file, decimal=True),
+        ),
+    ]
+    if find_spec("numpy") is not None:
+        cases.append(
+            ("ArrayCurrencyConverter", lambda: ArrayCurrencyConverter(currency_file))
+        )
+
+    print(f"Loading {currency_file}, median of {repeat} runs")
+    for name, function in cases:
+        duration, peak = measure(function, repeat)
+        print(f"{name:<36} {duration * 1000:8.1f} ms {peak / 1e6:8.1f} MB peak")
+
+
+def bench_startup(currency_file, repeat):
+    """Time new interpreters importing the package, and running the command line."""
+    cases = [
+        ("python", ["-c", "pass"]),
+        ("import currency_converter", ["-c", "import currency_converter"]),
+        ("currency_converter 100 USD", ["-m", "currency_converter", "100", "USD"]),
+        (
+            "currency_converter 100 USD --date",
+            ["-m", "currency_converter", "100", "USD", "--date", "2014-03-28"],
+        ),
+    ]
+
+    print(f"Startup with {currency_file}, median of {repeat} runs")
+    for name, arguments in cases:
+        if arguments[0] == "-m":
+            arguments = [*arguments, "--file", currency_file]
+        durations = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, *arguments], check=True, capture_output=True
+            )
+            durations.append(time.perf_counter() - start)
+        print(f"{name:<36} {statistics.median(durations) * 1000:8.1f} ms")
+
+    # Import time of each module, from the interpreter itself
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import currency_converter"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    lines = [line.split("|") for line in result.stderr.splitlines()[1:]]
+    slowest = sorted(lines, key=lambda line: int(line[1]), reverse=True)[:5]
+    print("Slowest imports, cumulative:")
+    for _, cumulative, name in slowest:
+        print(f"{name.strip():<36} {int(cumulative) / 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("currency_file", nargs="?", default=CURRENCY_FILE)
+    parser.add_argument("-r", "--repeat", type=int, default=10)
+    parser.add_argument(
+        "-s", "--startup", action="store_true", help="benchmark the command line"
+    )
+    args = parser.parse_args()
+
+    if args.startup:
+        bench_startup(args.currency_file, args.repeat)
+    else:
+        bench_load(args.currency_file, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 #!/usr/bin/env python
 
 import sys
-from itertools import zip_longest
+from collections import deque
+from itertools import count, islice, zip_longest
 
-from .currency_converter import CurrencyConverter, CURRENCY_FILE, parse_date
+from .currency_converter import (
+    CURRENCY_FILE,
+    SINGLE_DAY_CURRENCY_FILE,
+    CurrencyConverter,
+    iter_lines,
+    parse_date,
+)
 from ._version import __version__
 
 
@@ -19,7 +26,195 @@ def grouper(iterable, n, fillvalue=None):
     return list(zip_longest(*[iter(iterable)] * n, fillvalue=fillvalue))
 
 
-def main():
+def latest_rates(currency_file):
+    """Date and rates of the first row of an ECB file, the most recent one.
+
+    Only the header and the first row are read, missing rates are left out.
+
+    >>> date, rates = latest_rates(SINGLE_DAY_CURRENCY_FILE)
+    >>> rates["EUR"]
+    '1'
+    """
+    lines = iter_lines(currency_file)
+    try:
+        header = [currency.strip() for currency in next(lines).split(",")]
+        row = [rate.strip() for rate in next(lines).split(",")]
+    finally:
+        lines.close()
+
+    rates = {
+        currency: rate
+        for currency, rate in zip(header[1:], row[1:])
+        if currency and rate not in ("", "N/A")
+    }
+    rates["EUR"] = "1"
+    return parse_date(row[0]), rates
+
+
+def convert_latest(args):
+    """Convert with the latest rates of the packaged files, or return None.
+
+    Without a date, the command line uses the last rate of the currency, so
+    when both currencies have a rate on the most recent date, the result is
+    the same as with the whole history, which is not parsed.
+    """
+    if args.date is not None or args.verbose:
+        return None
+    if args.file not in (CURRENCY_FILE, SINGLE_DAY_CURRENCY_FILE):
+        return None  # other files may not list the most recent date first
+
+    date, rates = latest_rates(args.file)
+    if args.currency not in rates or args.to not in rates:
+        return None
+
+    if args.decimal:
+        from decimal import Decimal as cast
+    else:
+        cast = float
+    new_amount = cast(args.amount) / cast(rates[args.currency]) * cast(rates[args.to])
+    return new_amount, date
+
+
+def convert_records(c, lines, to="EUR", output="csv", start=1):
+    """Convert records, yielding (line, error) with one of them None.
+
+    Records are CSV lines ``amount,currency[,to[,date]]``, or JSON objects
+    with these keys. Like the command line, the currency defaults to `to`
+    and the date to the last date of the currency. A CSV header is skipped.
+    The amount is written back as it was read, and in JSON the converted
+    amount is a number, with or without decimals.
+
+    >>> c = CurrencyConverter()
+    >>> for line, error in convert_records(c, ["100,EUR,USD,2014-03-28", "1,XYZ"]):
+    ...     print(line or error)
+    100,EUR,137.5...,USD,2014-03-28
+    line 2: XYZ is not a supported currency
+    """
+    import csv
+    import json
+
+    if output == "csv":
+        records = _numbered_csv_records(csv.reader(lines), start)
+    else:
+        records = enumerate(lines, start)
+
+    for number, record in records:
+        try:
+            if output == "csv":
+                if not record or record[0] == "amount":
+                    continue
+                amount, currency, new_currency, date = [*record, "", "", ""][:4]
+            else:
+                if not record.strip():
+                    continue
+                record = json.loads(
+                    record, parse_float=_JSONNumber, parse_int=_JSONNumber
+                )
+                amount = record["amount"]
+                currency = record["currency"]
+                new_currency = record.get("to")
+                date = record.get("date")
+
+            new_currency = new_currency or to
+            date = parse_date(date) if date else None
+            new_amount = c.convert(amount, currency, new_currency, date)
+            if date is None:
+                date = c.bounds[currency].last_date
+        except KeyError as e:
+            yield None, f"line {number}: missing {e}"
+            continue
+        except Exception as e:
+            yield None, f"line {number}: {e}"
+            continue
+
+        if output == "csv":
+            yield f"{amount},{currency},{new_amount},{new_currency},{date}", None
+        else:
+            record = {
+                "amount": amount,
+                "currency": currency,
+                "new_amount": new_amount,
+                "to": new_currency,
+                "date": date.isoformat(),
+            }
+            yield _dump_record(record), None
+
+
+class _JSONNumber(str):
+    """Text of a number read from JSON, to be written back unchanged."""
+
+
+def _dump_record(record):
+    """Encode a record as a JSON object, with numbers written as JSON numbers.
+
+    >>> from decimal import Decimal
+    >>> _dump_record({"amount": _JSONNumber("1.10"), "new_amount": Decimal("1.2")})
+    '{"amount": 1.10, "new_amount": 1.2}'
+    """
+    import json
+    from decimal import Decimal
+
+    items = []
+    for key, value in record.items():
+        if isinstance(value, (_JSONNumber, Decimal)):
+            value = str(value)
+        else:
+            value = json.dumps(value)
+        items.append(f"{json.dumps(key)}: {value}")
+    return "{" + ", ".join(items) + "}"
+
+
+def _numbered_csv_records(reader, start):
+    """Yield (line, record), records being numbered by their first line."""
+    line_num = 0
+    for record in reader:
+        yield start + line_num, record
+        line_num = reader.line_num
+
+
+_converter = None  # of the worker processes of --jobs
+
+
+def _init_worker(options):
+    global _converter
+    _converter = CurrencyConverter(**options)
+    _converter.precompute_cross_rates()
+
+
+def _convert_chunk(start, lines, to, output):
+    return list(convert_records(_converter, lines, to, output, start))
+
+
+def convert_batch(options, lines, to="EUR", output="csv", jobs=1, chunk_size=10000):
+    """Convert records with the converter loaded once, or once per process.
+
+    With several jobs, chunks of lines are converted by a pool of processes,
+    with only a few of them in flight so that memory does not grow with the
+    input, and the results are yielded in order.
+    """
+    if jobs <= 1:
+        _init_worker(options)
+        yield from convert_records(_converter, lines, to, output)
+        return
+
+    from multiprocessing import Pool
+
+    lines = iter(lines)
+    pending = deque()
+    with Pool(jobs, _init_worker, (options,)) as pool:
+        for start in count(1, chunk_size):
+            chunk = list(islice(lines, chunk_size))
+            if chunk:
+                pending.append(
+                    pool.apply_async(_convert_chunk, (start, chunk, to, output))
+                )
+            while pending and (not chunk or len(pending) > 2 * jobs):
+                yield from pending.popleft().get()
+            if not chunk:
+                break
+
+
+def main(argv=None):
     import argparse
 
     parser = argparse.ArgumentParser(prog="currency_converter")
@@ -28,8 +223,8 @@ def main():
         action="version",
         version=f"%(prog)s, version {__version__}",
     )
-    parser.add_argument("amount", type=float)
-    parser.add_argument("currency")
+    parser.add_argument("amount", type=float, nargs="?")
+    parser.add_argument("currency", nargs="?")
 
     parser.add_argument(
         "-t",
@@ -69,15 +264,61 @@ def main():
         default=CURRENCY_FILE,
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "-b",
+        "--batch",
+        help=(
+            "convert the records of FILE, or of stdin if omitted, instead of "
+            "one amount, see --format"
+        ),
+        nargs="?",
+        const="-",
+        metavar="FILE",
+    )
+
+    parser.add_argument(
+        "--format",
+        help=(
+            "format of the batch records, amount,currency[,to[,date]] lines "
+            "or JSON objects with these keys, written back with the new_amount "
+            "after the amount, default is %(default)s"
+        ),
+        choices=["csv", "jsonl"],
+        default="csv",
+    )
 
-    c = CurrencyConverter(
-        currency_file=args.file,
-        fallback_on_wrong_date=True,
-        fallback_on_missing_rate=True,
-        decimal=args.decimal,
-        verbose=args.verbose > 1,
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of processes converting the batch records, default is 1",
+        type=int,
+        default=1,
     )
+
+    args = parser.parse_args(argv)
+
+    options = {
+        "currency_file": args.file,
+        "fallback_on_wrong_date": True,
+        "fallback_on_missing_rate": True,
+        "decimal": args.decimal,
+        "verbose": args.verbose > 1,
+    }
+
+    if args.batch is not None:
+        return batch(args, options)
+    if args.amount is None or args.currency is None:
+        parser.error("the following arguments are required: amount, currency")
+
+    latest = convert_latest(args)
+    if latest is not None:
+        new_amount, date = latest
+        print(
+            f"{args.amount:,.3f} {args.currency} = {new_amount:,.3f} {args.to} on {date}"
+        )
+        return
+
+    c = CurrencyConverter(**options)
     currencies = sorted(c.currencies)
 
     if args.verbose:
@@ -118,5 +359,25 @@ def main():
     print(f"{args.amount:,.3f} {args.currency} = {new_amount:,.3f} {args.to} on {date}")
 
 
+def batch(args, options):
+    """Write the converted records of --batch to stdout, and errors to stderr."""
+    if args.batch == "-":
+        f = sys.stdin
+    else:
+        f = open(args.batch, encoding="utf-8", newline="")
+
+    errors = 0
+    with f:
+        results = convert_batch(options, f, args.to, args.format, args.jobs)
+        for line, error in results:
+            if error is None:
+                print(line)
+            else:
+                print(error, file=sys.stderr)
+                errors += 1
+
+    return 1 if errors else 0
+
+
 if __name__ == "__main__":
     sys.exit(main())
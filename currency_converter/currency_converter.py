@@ -1,14 +1,15 @@
 #!/usr/bin/env python
 
+import os
 import os.path as op
-from functools import wraps
+import json
+import threading
+from functools import lru_cache
 import datetime
 from datetime import timedelta
-from collections import defaultdict, namedtuple
-from zipfile import ZipFile
-from io import BytesIO
-from decimal import Decimal
-from urllib.request import urlopen
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from io import BytesIO, TextIOWrapper
 
 _DIRNAME = op.realpath(op.dirname(__file__))
 CURRENCY_FILE = op.join(_DIRNAME, "eurofxref-hist.zip")
@@ -17,31 +18,42 @@ ECB_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref-hist.zip"
 SINGLE_DAY_ECB_URL = "https://www.ecb.europa.eu/stats/eurofxref/eurofxref.zip"
 
 Bounds = namedtuple("Bounds", "first_date last_date")
+Series = namedtuple("Series", "dates rates")
+
+_SNAPSHOT_MAGIC = b"CCSNAP1\n"
+
+_FALLBACK_METHODS = ("linear_interpolation", "last_known")
 
 __all__ = [
     "CURRENCY_FILE",
     "ECB_URL",
     "SINGLE_DAY_CURRENCY_FILE",
     "SINGLE_DAY_ECB_URL",
+    "ArrayCurrencyConverter",
     "CurrencyConverter",
     "RateNotFoundError",
     "S3CurrencyConverter",
 ]
 
 
-def memoize(function):
-    memo = {}
+def memoize(maxsize=128):
+    """Cache the results of a function, in a thread-safe LRU cache.
+
+    At most ``maxsize`` results are kept, the least recently used ones are
+    evicted first. Hits, misses and size are returned by ``cache_info()``.
+    """
+    return lru_cache(maxsize=maxsize)
 
-    @wraps(function)
-    def wrapper(*args):
-        if args not in memo:
-            memo[args] = function(*args)
-        return memo[args]
 
-    return wrapper
+def cache_info():
+    """Statistics of the caches of this module, by function name."""
+    return {
+        function.__name__: function.cache_info()._asdict()
+        for function in (list_dates_between, parse_date)
+    }
 
 
-@memoize
+@memoize(maxsize=64)
 def list_dates_between(first_date, last_date):
     """Returns all dates from first to last included."""
     return [
@@ -49,7 +61,7 @@ def list_dates_between(first_date, last_date):
     ]
 
 
-@memoize
+@memoize(maxsize=16384)  # enough for all dates of the history
 def parse_date(s):
     """Fast %Y-%m-%d parsing."""
     try:
@@ -58,10 +70,280 @@ def parse_date(s):
         return datetime.datetime.strptime(s, "%d %B %Y").date()
 
 
-def get_lines_from_zip(zip_str):
-    zip_file = ZipFile(BytesIO(zip_str))
+def _iter_zip_lines(zip_file):
+    """Stream the lines of all members, without decompressing them in memory."""
     for name in zip_file.namelist():
-        yield from zip_file.read(name).decode("utf-8").splitlines()
+        with zip_file.open(name) as f:
+            yield from TextIOWrapper(f, encoding="utf-8")
+
+
+def get_lines_from_zip(zip_str):
+    from zipfile import ZipFile
+
+    yield from _iter_zip_lines(ZipFile(BytesIO(zip_str)))
+
+
+def get_lines(currency_file, content):
+    if currency_file.endswith(".zip"):
+        return get_lines_from_zip(content)
+    return content.decode("utf-8").splitlines()
+
+
+def iter_lines(currency_file):
+    """Stream the lines of a local file or an URL, zipped or not."""
+    if currency_file.startswith(("http://", "https://")):
+        from urllib.request import urlopen
+
+        content = urlopen(currency_file).read()
+        yield from get_lines(currency_file, content)
+    elif currency_file.endswith(".zip"):
+        from zipfile import ZipFile
+
+        with ZipFile(currency_file) as zip_file:
+            yield from _iter_zip_lines(zip_file)
+    else:
+        with open(currency_file, encoding="utf-8") as f:
+            yield from f
+
+
+def write_snapshot(path, header, table, known=None):
+    """Atomically write a table of rates and its JSON header to a file.
+
+    The table is stored as little-endian float64 in C order, aligned on 64
+    bytes so that it can be memory mapped. The bytes of ``known``, if given,
+    follow the table.
+    """
+    import tempfile
+
+    header = json.dumps(header).encode("utf-8")
+    offset = len(_SNAPSHOT_MAGIC) + 8 + len(header)
+    header += b" " * (-offset % 64)
+
+    fd, tmp_path = tempfile.mkstemp(dir=op.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            f.write(table.astype("<f8", order="C", copy=False).tobytes())
+            if known is not None:
+                f.write(known.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_snapshot_header(path):
+    """Read the JSON header of a snapshot file, and the offset of its table."""
+    with open(path, "rb") as f:
+        if f.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(size))
+    return header, len(_SNAPSHOT_MAGIC) + 8 + size
+
+
+class _SortedRates:
+    """Rates of one currency, as the sorted dates having a rate and their rates.
+
+    This behaves like a ``{date: rate}`` dictionary with every day within the
+    currency bounds. Missing rates are computed on lookup with the fallback
+    method, or returned as None if there is none.
+    """
+
+    __slots__ = ("dates", "fallback", "rates")
+
+    def __init__(self, rates, fallback=None):
+        self.dates = sorted(rates)
+        self.rates = [rates[date] for date in self.dates]
+        self.fallback = fallback
+
+    def __contains__(self, date):
+        return self.dates[0] <= date <= self.dates[-1]
+
+    def __getitem__(self, date):
+        i = bisect_left(self.dates, date)
+        if i < len(self.dates) and self.dates[i] == date:
+            return self.rates[i]
+        if i == 0 or i == len(self.dates):
+            raise KeyError(date)
+
+        if self.fallback == "last_known":
+            return self.rates[i - 1]
+        if self.fallback == "linear_interpolation":
+            # Weighted by the distance to the two closest available rates
+            d0 = (date - self.dates[i - 1]).days
+            d1 = (self.dates[i] - date).days
+            return (self.rates[i - 1] * d1 + self.rates[i] * d0) / (d0 + d1)
+        return None
+
+    def between(self, start, end):
+        """Dates from start to end and their rates, as two lists.
+
+        Every day is included if missing rates are computed, otherwise only the
+        days having a rate. The dates must be within the bounds.
+        """
+        i = bisect_left(self.dates, start)
+        j = bisect_right(self.dates, end)
+        if self.fallback is None:
+            return self.dates[i:j], self._slice(i, j)
+
+        # Fill the days between the available rates around the range, like
+        # __getitem__ does for each of them
+        i = max(i - 1, 0)
+        available = list(zip(self.dates[i : j + 1], self._slice(i, j + 1)))
+        rates = []
+        for (d0, r0), (d1, r1) in zip(available, available[1:]):
+            rates.append(r0)
+            days = (d1 - d0).days
+            if days == 1:
+                continue
+            if self.fallback == "last_known":
+                rates.extend([r0] * (days - 1))
+            else:
+                rates.extend((r0 * (days - n) + r1 * n) / days for n in range(1, days))
+        rates.append(available[-1][1])
+
+        first = (start - available[0][0]).days
+        days = range(start.toordinal(), end.toordinal() + 1)
+        dates = list(map(datetime.date.fromordinal, days))
+        return dates, rates[first : first + len(dates)]
+
+    def _slice(self, i, j):
+        return self.rates[i:j]
+
+    def update(self, rates):
+        """Add or replace rates from a ``{date: rate}`` dictionary."""
+        dates = sorted(rates)
+        if dates[0] > self.dates[-1]:  # new days, the usual case
+            self.dates.extend(dates)
+            self.rates.extend(rates[date] for date in dates)
+        else:
+            merged = dict(zip(self.dates, self.rates))
+            merged.update(rates)
+            self.dates = sorted(merged)
+            self.rates = [merged[date] for date in self.dates]
+
+
+def _to_fixed_point(strings):
+    """Scale and integer values of decimal strings, exactly equal to the strings.
+
+    The scale is the largest number of decimals, so the values are
+    ``string * 10 ** scale``. Return None if the strings are not plain decimals
+    or have more than 15 significant digits.
+    """
+    # find() is -1 without a decimal point, so the whole string counts as
+    # decimals: the scale is then too large, which keeps the values exact but
+    # can exceed the 10**15 limit below, and give None
+    scale = max(len(s) - s.find(".") for s in strings) - 1
+    factor = 10**scale
+    floats = list(map(float, strings))
+    # Exact: both the integers and the strings have at most 15 significant
+    # digits, so they are equal if and only if their closest floats are.
+    values = list(map(round, map(float(factor).__mul__, floats)))
+    if max(map(abs, values)) >= 10**15:
+        return None
+    if list(map(factor.__rtruediv__, values)) != floats:
+        return None
+    return scale, values
+
+
+class _FixedPointRates(_SortedRates):
+    """Exact rates of one currency, stored as integers of a fixed scale.
+
+    The rates are kept as strings, and converted to integers on first use, which
+    is exact and much faster than parsing them as Decimal. They are converted
+    to Decimal only when returned. Rates which cannot be stored as integers are
+    stored as Decimal, with a scale of 0.
+    """
+
+    __slots__ = ("_fixed_point",)
+
+    Decimal = None  # imported with the first instance, to keep imports fast
+
+    def __init__(self, rates, fallback=None):
+        if _FixedPointRates.Decimal is None:
+            from decimal import Decimal
+
+            _FixedPointRates.Decimal = Decimal
+
+        super().__init__(rates, fallback)
+        self._fixed_point = None
+
+    def fixed_point(self):
+        """Scale and values of the rates, converted on first use."""
+        fixed_point = self._fixed_point
+        if fixed_point is None:
+            fixed_point = _to_fixed_point(self.rates)
+            if fixed_point is None:
+                fixed_point = 0, list(map(self.Decimal, self.rates))
+            self._fixed_point = fixed_point
+        return fixed_point
+
+    def _to_decimal(self, value, scale):
+        """Decimal of a fixed-point value, without trailing zeros in its decimals."""
+        while scale and not value % 10:
+            value //= 10
+            scale -= 1
+        return self.Decimal(value).scaleb(-scale)
+
+    def __getitem__(self, date):
+        scale, values = self.fixed_point()
+        i = bisect_left(self.dates, date)
+        if i < len(self.dates) and self.dates[i] == date:
+            return self._to_decimal(values[i], scale)
+        if i == 0 or i == len(self.dates):
+            raise KeyError(date)
+
+        if self.fallback == "last_known":
+            return self._to_decimal(values[i - 1], scale)
+        if self.fallback == "linear_interpolation":
+            d0 = (date - self.dates[i - 1]).days
+            d1 = (self.dates[i] - date).days
+            value = values[i - 1] * d1 + values[i] * d0
+            return self._to_decimal(value, scale) / (d0 + d1)
+        return None
+
+    def _slice(self, i, j):
+        scale, values = self.fixed_point()
+        return [self._to_decimal(value, scale) for value in values[i:j]]
+
+    def update(self, rates):
+        """Add or replace rates from a ``{date: rate}`` dictionary of strings."""
+        super().update(rates)
+        self._fixed_point = None
+
+
+class _LazyRates(dict):
+    """Rates of each currency, parsed from the source lines on first access.
+
+    The lines are released once all currencies are parsed.
+    """
+
+    def __init__(self, columns, lines, dates, build, parse_column):
+        super().__init__()
+        self.columns = columns  # currency -> column of the currencies not parsed yet
+        self.lines = lines
+        self.dates = dates
+        self.build = build
+        self.parse_column = parse_column
+        self._lock = threading.Lock()
+
+    def __contains__(self, currency):
+        return super().__contains__(currency) or currency in self.columns
+
+    def __missing__(self, currency):
+        with self._lock:
+            if super().__contains__(currency):  # parsed by another thread
+                return super().__getitem__(currency)
+            n = self.columns[currency]
+            rates = self.parse_column(self.lines, self.dates, n)
+            self[currency] = rates = self.build(rates)
+            del self.columns[currency]
+            if not self.columns:
+                self.lines = self.dates = None
+            return rates
 
 
 class RateNotFoundError(Exception):
@@ -80,7 +362,8 @@ class CurrencyConverter:
     ``_rates`` is a dictionary with:
 
     - currencies as keys
-    - {date: rate, ...} as values.
+    - the sorted dates and rates available as values, which behave like
+      {date: rate, ...} dictionaries with every day within the bounds.
 
     ``currencies`` is a set of all available currencies.
     ``bounds`` is a dict if first and last date available per currency.
@@ -96,6 +379,7 @@ class CurrencyConverter:
         na_values=frozenset(["", "N/A"]),
         decimal=False,
         verbose=False,
+        lazy=False,
     ):
         """Instantiate a CurrencyConverter.
 
@@ -120,9 +404,13 @@ class CurrencyConverter:
             default European Central Bank data, and so the default is 'EUR'.
         :param iterable na_values: What to interpret as missing values in the
             source data.
-        :param decimal: Set to True to use decimal.Decimal internally, this will
-            slow the loading time but will allow exact conversions
+        :param decimal: Set to True to get exact conversions as decimal.Decimal.
+            Rates are stored as fixed-point integers, and only converted to
+            Decimal when they are used.
         :param verbose: Set to True to print what is going on under the hood.
+        :param lazy: Set to True to only parse the rates of a currency when it
+            is first used, which makes loading faster when few currencies are
+            used. The source lines are kept in memory until then.
         """
         # Global options
         self.fallback_on_wrong_date = fallback_on_wrong_date
@@ -130,146 +418,208 @@ class CurrencyConverter:
         self.fallback_on_missing_rate_method = fallback_on_missing_rate_method
         self.ref_currency = ref_currency  # reference currency of rates
         self.na_values = na_values  # missing values
-        self.cast = Decimal if decimal else float
+        self.decimal = decimal
+        if decimal:
+            from decimal import Decimal
+
+            self.cast = Decimal
+        else:
+            self.cast = float
         self.verbose = verbose
+        self.lazy = lazy
 
         # Will be filled once the file is loaded
         self._rates = None
         self.bounds = None
         self.currencies = None
 
+        # Rates of pairs for convert(), see precompute_cross_rates
+        self._cross_rates = {}
+        self._cross_rates_spec = None
+
         if currency_file is not None:
             self.load_file(currency_file)
 
     def load_file(self, currency_file):
         """To be subclassed if alternate methods of loading data."""
-        if currency_file.startswith(("http://", "https://")):
-            content = urlopen(currency_file).read()
-        else:
-            with open(currency_file, "rb") as f:
-                content = f.read()
+        self.load_lines(iter_lines(currency_file))
 
-        if currency_file.endswith(".zip"):
-            self.load_lines(get_lines_from_zip(content))
-        else:
-            self.load_lines(content.decode("utf-8").splitlines())
+    def merge_file(self, currency_file):
+        """Add the rates of another file to the loaded ones, see ``apply_update``.
 
-    def load_lines(self, lines):
-        _rates = self._rates = defaultdict(dict)
-        na_values = self.na_values
-        cast = self.cast
-
-        lines = iter(lines)
-        header = next(lines).strip().split(",")[1:]
-
-        for line in lines:
-            line = line.strip().split(",")
-            date = parse_date(line[0])
-            for currency, rate in zip(header, line[1:]):
-                currency = currency.strip()
-                if rate not in na_values and currency:  # skip empty currency
-                    _rates[currency][date] = cast(rate)
+        :param str currency_file: Path or URL of the file, for example
+            ``SINGLE_DAY_CURRENCY_FILE`` or ``SINGLE_DAY_ECB_URL``.
+        """
+        self.apply_update(iter_lines(currency_file))
 
+    def load_lines(self, lines):
+        method = self.fallback_on_missing_rate_method
+        if self.fallback_on_missing_rate and method not in _FALLBACK_METHODS:
+            raise ValueError(f"Unknown fallback method {method!r}")
+
+        if self.lazy:
+            self._load_lazy(lines)
+            self._update_cross_rates()
+            return
+
+        self._rates = {
+            currency: self._sorted_rates(rates)
+            for currency, rates in self._parse_lines(lines).items()
+        }
         self.currencies = set(self._rates) | {self.ref_currency}
         self._compute_bounds()
 
-        for currency in sorted(self._rates):
-            self._set_missing_to_none(currency)
-            if self.fallback_on_missing_rate:
-                method = self.fallback_on_missing_rate_method
-                if method == "linear_interpolation":
-                    self._use_linear_interpolation(currency)
-                elif method == "last_known":
-                    self._use_last_known(currency)
-                else:
-                    raise ValueError(f"Unknown fallback method {method!r}")
+        if self.verbose:
+            for currency in sorted(self._rates):
+                self._print_missing(currency)
+
+        self._update_cross_rates()
 
-    def _compute_bounds(self):
+    def _load_lazy(self, lines):
+        """Keep the lines, and only find the currencies and their bounds."""
+        na_values = self.na_values
+
+        lines = iter(lines)
+        header = [currency.strip() for currency in next(lines).strip().split(",")]
+        columns = {currency: n for n, currency in enumerate(header) if n and currency}
+
+        lines = [line.strip() for line in lines]
+        dates = [parse_date(line.split(",", 1)[0]) for line in lines]
+        by_date = sorted(range(len(lines)), key=dates.__getitem__)
+
+        def first_available(indexes):
+            """Date of the first line with a rate, per currency."""
+            found = {}
+            remaining = list(columns.items())
+            for i in indexes:
+                if not remaining:
+                    break
+                row = lines[i].split(",")
+                for currency, n in remaining:
+                    if n < len(row) and row[n] not in na_values:
+                        found[currency] = dates[i]
+                remaining = [(c, n) for c, n in remaining if c not in found]
+            return found
+
+        first_dates = first_available(by_date)
+        last_dates = first_available(reversed(by_date))
+
+        # Currencies without any rate are dropped, like when parsing everything
+        self._rates = _LazyRates(
+            {currency: columns[currency] for currency in first_dates},
+            lines,
+            dates,
+            self._sorted_rates,
+            self._parse_column,
+        )
+        self.currencies = set(first_dates) | {self.ref_currency}
         self.bounds = {
-            currency: Bounds(min(r), max(r)) for currency, r in self._rates.items()
+            currency: Bounds(first_dates[currency], last_dates[currency])
+            for currency in first_dates
         }
-
         self.bounds[self.ref_currency] = Bounds(
-            min(b.first_date for b in self.bounds.values()),
-            max(b.last_date for b in self.bounds.values()),
+            min(first_dates.values()), max(last_dates.values())
         )
 
-    def _set_missing_to_none(self, currency):
-        """Fill missing rates of a currency with the closest available ones."""
-        rates = self._rates[currency]
-        first_date, last_date = self.bounds[currency]
-
-        for date in list_dates_between(first_date, last_date):
-            if date not in rates:
-                rates[date] = None
+    def _parse_column(self, lines, dates, n):
+        """Parse the rates of the n-th column of lines, as a dict of {date: rate}."""
+        na_values = self.na_values
+        cast = str if self.decimal else self.cast  # see _sorted_rates
 
-        if self.verbose:
-            missing = len([r for r in rates.values() if r is None])
-            if missing:
-                print(
-                    f"{currency}: {missing} missing rates from {first_date} to {last_date}"
-                    f" ({1 + (last_date - first_date).days} days)"
-                )
+        rates = {}
+        for line, date in zip(lines, dates):
+            row = line.split(",", n + 1)  # do not split the next columns
+            if n < len(row):
+                rate = row[n]
+                if rate not in na_values:
+                    rates[date] = cast(rate)
+        return rates
 
-    def _use_linear_interpolation(self, currency):
-        """Fill missing rates of a currency.
+    def apply_update(self, lines):
+        """Add rates to the loaded ones in place, for example the daily rates.
 
-        This is done by linear interpolation of the two closest available rates.
+        The bounds are extended to the new dates, and rates of dates already
+        loaded are replaced.
 
-        :param str currency: The currency to fill missing rates for.
+        :param lines: Iterable of lines in the same format as the source data.
         """
-        rates = self._rates[currency]
+        for currency, new_rates in self._parse_lines(lines).items():
+            if currency in self._rates:
+                self._rates[currency].update(new_rates)
+            else:
+                self._rates[currency] = self._sorted_rates(new_rates)
+                self.currencies.add(currency)
+            rates = self._rates[currency]
+            self.bounds[currency] = Bounds(rates.dates[0], rates.dates[-1])
 
-        # tmp will store the closest rates forward and backward
-        tmp = defaultdict(lambda: [None, None])
+        self.bounds[self.ref_currency] = Bounds(
+            min(b.first_date for c, b in self.bounds.items() if c != self.ref_currency),
+            max(b.last_date for c, b in self.bounds.items() if c != self.ref_currency),
+        )
+        self._update_cross_rates()
+
+    def _fallback_method(self):
+        """Method used to compute missing rates, None if they are not computed."""
+        if self.fallback_on_missing_rate:
+            return self.fallback_on_missing_rate_method
+        return None
+
+    def _sorted_rates(self, rates):
+        """Store the parsed rates of a currency, strings when decimal is set."""
+        if self.decimal:
+            return _FixedPointRates(rates, self._fallback_method())
+        return _SortedRates(rates, self._fallback_method())
+
+    def _parse_lines(self, lines):
+        """Parse lines of source data into a dict of {date: rate} per currency."""
+        na_values = self.na_values
+        cast = str if self.decimal else self.cast  # see _sorted_rates
 
-        for date in sorted(rates):
-            rate = rates[date]
-            if rate is not None:
-                closest_rate = rate
-                dist = 0
-            else:
-                dist += 1
-                tmp[date][0] = closest_rate, dist
-
-        for date in sorted(rates, reverse=True):
-            rate = rates[date]
-            if rate is not None:
-                closest_rate = rate
-                dist = 0
-            else:
-                dist += 1
-                tmp[date][1] = closest_rate, dist
+        lines = iter(lines)
+        header = [currency.strip() for currency in next(lines).strip().split(",")]
+        width = len(header)
 
-        for date in sorted(tmp):
-            (r0, d0), (r1, d1) = tmp[date]
-            rates[date] = (r0 * d1 + r1 * d0) / (d0 + d1)
-            if self.verbose:
-                print(
-                    f"{currency}: filling {date} missing rate using"
-                    f" {r0} ({d0}d old) and {r1} ({d1}d later)"
-                )
+        # Map each column to the rates of its currency once, skip empty currency
+        _rates = {currency: {} for currency in header[1:] if currency}
+        columns = [
+            (n, _rates[currency]) for n, currency in enumerate(header) if n and currency
+        ]
 
-    def _use_last_known(self, currency):
-        """Fill missing rates of a currency.
+        for line in lines:
+            row = line.strip().split(",")
+            date = parse_date(row[0])
+            if len(row) < width:  # ignore the missing trailing cells
+                row_columns = [(n, rates) for n, rates in columns if n < len(row)]
+            else:
+                row_columns = columns
+            for n, rates in row_columns:
+                rate = row[n]
+                if rate not in na_values:
+                    rates[date] = cast(rate)
 
-        This is done by using the last known rate.
+        return {currency: rates for currency, rates in _rates.items() if rates}
 
-        :param str currency: The currency to fill missing rates for.
-        """
-        rates = self._rates[currency]
+    def _compute_bounds(self):
+        self.bounds = {
+            currency: Bounds(r.dates[0], r.dates[-1])
+            for currency, r in self._rates.items()
+        }
 
-        for date in sorted(rates):
-            rate = rates[date]
-            if rate is not None:
-                last_rate, last_date = rate, date
-            else:
-                rates[date] = last_rate
-                if self.verbose:
-                    print(
-                        f"{currency}: filling {date} missing rate using"
-                        f" {last_rate} from {last_date}"
-                    )
+        self.bounds[self.ref_currency] = Bounds(
+            min(b.first_date for b in self.bounds.values()),
+            max(b.last_date for b in self.bounds.values()),
+        )
+
+    def _print_missing(self, currency):
+        """Print how many rates of a currency are missing within its bounds."""
+        first_date, last_date = self.bounds[currency]
+        days = 1 + (last_date - first_date).days
+        missing = days - len(self._rates[currency].dates)
+        if missing:
+            print(
+                f"{currency}: {missing} missing rates from {first_date} to {last_date}"
+                f" ({days} days)"
+            )
 
     def _get_rate(self, currency, date):
         """Get a rate for a given currency and date.
@@ -337,23 +687,659 @@ class CurrencyConverter:
         Traceback (most recent call last):
         RateNotFoundError: BGN has no rate for 2010-11-21
         """
+        if date is not None:
+            try:
+                date = date.date()  # fallback if input was a datetime object
+            except AttributeError:
+                pass
+
+        cross_rates = self._cross_rates.get(date)
+        if cross_rates is not None:
+            rates = cross_rates.get((currency, new_currency))
+            if rates is not None:
+                r0, r1 = rates
+                return self.cast(amount) / r0 * r1
+
         for c in currency, new_currency:
             if c not in self.currencies:
                 raise ValueError(f"{c} is not a supported currency")
 
         if date is None:
             date = self.bounds[currency].last_date
-        else:
-            try:
-                date = date.date()  # fallback if input was a datetime object
-            except AttributeError:
-                pass
 
         r0 = self._get_rate(currency, date)
         r1 = self._get_rate(new_currency, date)
 
         return self.cast(amount) / r0 * r1
 
+    def precompute_cross_rates(self, currencies=None, dates=(None,)):
+        """Precompute the rates of every pair of currencies, for the hottest conversions.
+
+        convert() then finds the rates of these pairs with a single lookup,
+        for these dates, and gives the same results. The rates are computed
+        again whenever rates are loaded or updated, and replaced all at once.
+
+        :param iterable currencies: The currencies of the pairs, defaults to
+            all of them.
+        :param iterable dates: The dates to precompute, None being the most
+            recent rate of the currency to convert from, like in convert().
+            Defaults to only None.
+
+        >>> c = CurrencyConverter()
+        >>> c.precompute_cross_rates(['EUR', 'USD', 'GBP'])
+        >>> c.convert(100, 'EUR', 'USD') == CurrencyConverter().convert(100, 'EUR', 'USD')
+        True
+        """
+        if currencies is not None:
+            currencies = list(currencies)
+        self._cross_rates_spec = (currencies, list(dates))
+        self._update_cross_rates()
+
+    def _update_cross_rates(self):
+        """Compute the precomputed rates of pairs again, and swap them in."""
+        if self._cross_rates_spec is None or self._rates is None:
+            return
+
+        currencies, dates = self._cross_rates_spec
+        if currencies is None:
+            currencies = sorted(self.currencies)
+        currencies = [c for c in currencies if c in self.currencies]
+
+        rates_on = {}  # {date: {currency: rate}}, computed once per date
+        cross_rates = {}
+        for date in dates:
+            try:
+                date = date.date()
+            except AttributeError:
+                pass
+
+            pairs = {}
+            for currency in currencies:
+                rate_date = self.bounds[currency].last_date if date is None else date
+                if rate_date not in rates_on:
+                    rates_on[rate_date] = {}
+                    for c in currencies:
+                        try:
+                            rates_on[rate_date][c] = self._get_rate(c, rate_date)
+                        except RateNotFoundError:
+                            pass
+                rates = rates_on[rate_date]
+                if currency in rates:
+                    r0 = rates[currency]
+                    pairs.update(((currency, c), (r0, r1)) for c, r1 in rates.items())
+            cross_rates[date] = pairs
+
+        self._cross_rates = cross_rates
+
+    def series(self, currency, new_currency="EUR", start=None, end=None):
+        """Conversion rates of a currency to another one, for a range of dates.
+
+        The rates are what ``convert(1, currency, new_currency, date)`` gives,
+        for every day from start to end if missing rates are computed, and
+        otherwise for the days both currencies have a rate. The dates are
+        limited to the bounds of both currencies.
+
+        :param str currency: The currency to convert from.
+        :param str new_currency: The currency to convert to.
+        :param datetime.date start: First date, defaults to the first one.
+        :param datetime.date end: Last date, defaults to the last one.
+
+        :return: The dates and their rates, as two lists of the same length.
+        :rtype: Series
+
+        >>> from datetime import date
+        >>> c = CurrencyConverter()
+        >>> s = c.series('EUR', 'USD', date(2014, 3, 27), date(2014, 3, 30))
+        >>> s.dates
+        [datetime.date(2014, 3, 27), datetime.date(2014, 3, 28)]
+        >>> s.rates
+        [1.3758, 1.3759]
+        """
+        start, end = self._series_bounds(currency, new_currency, start, end)
+        if start > end:
+            return Series([], [])
+
+        one = self.cast("1")
+        if currency == new_currency == self.ref_currency:
+            dates = list(list_dates_between(start, end))
+            return Series(dates, [one] * len(dates))
+        if currency == self.ref_currency:
+            dates, rates = self._rates[new_currency].between(start, end)
+            return Series(dates, [one * r1 for r1 in rates])
+        dates, rates = self._rates[currency].between(start, end)
+        if new_currency == self.ref_currency:
+            return Series(dates, [one / r0 for r0 in rates])
+
+        dates1, rates1 = self._rates[new_currency].between(start, end)
+        if dates1 == dates:  # every day when missing rates are computed
+            return Series(dates, [one / r0 * r1 for r0, r1 in zip(rates, rates1)])
+
+        # Only keep the days both currencies have a rate
+        rates1 = dict(zip(dates1, rates1))
+        pairs = [
+            (d, one / r0 * rates1[d]) for d, r0 in zip(dates, rates) if d in rates1
+        ]
+        return Series([d for d, _ in pairs], [r for _, r in pairs])
+
+    def _series_bounds(self, currency, new_currency, start, end):
+        """First and last dates of a series, within the bounds of the currencies."""
+        for c in currency, new_currency:
+            if c not in self.currencies:
+                raise ValueError(f"{c} is not a supported currency")
+
+        bounds = [self.bounds[c] for c in (currency, new_currency)]
+        first_date = max(b.first_date for b in bounds)
+        last_date = min(b.last_date for b in bounds)
+        try:
+            start = start.date()  # fallback if input was a datetime object
+        except AttributeError:
+            pass
+        try:
+            end = end.date()
+        except AttributeError:
+            pass
+        if start is not None:
+            first_date = max(first_date, start)
+        if end is not None:
+            last_date = min(last_date, end)
+        return first_date, last_date
+
+
+class _ArrayColumn:
+    """Rates of one currency, read from a column of the dense table.
+
+    This behaves like the ``{date: rate}`` dictionaries of CurrencyConverter:
+    a date is in the column if it is within the currency bounds, and missing
+    rates are returned as None.
+    """
+
+    __slots__ = ("_first_date", "_first_row", "_last_row", "_values")
+
+    def __init__(self, values, first_date, first_row, last_row):
+        self._values = values
+        self._first_date = first_date
+        self._first_row = first_row
+        self._last_row = last_row
+
+    def _row(self, date):
+        row = (date - self._first_date).days
+        if self._first_row <= row <= self._last_row:
+            return row
+        return None
+
+    def __contains__(self, date):
+        return self._row(date) is not None
+
+    def __getitem__(self, date):
+        row = self._row(date)
+        if row is None:
+            raise KeyError(date)
+        rate = self._values[row]
+        return None if rate != rate else float(rate)  # NaN is a missing rate
+
+
+class ArrayCurrencyConverter(CurrencyConverter):
+    """
+    Same as CurrencyConverter, but the rates are stored in one dense NumPy
+    array instead of dictionaries, which uses a lot less memory.
+    This requires NumPy to be installed, and does not support ``decimal=True``.
+
+    ``_table`` is a 2-D float array with one row per day from ``_first_date``
+    to the last date of the data, and one column per currency, the last column
+    being the reference currency. Missing rates are NaN.
+    ``_columns`` is a dict with currencies as keys and column indexes as values.
+    ``_row_bounds`` is an array with the first and last row of each column.
+    ``_known`` has the bits of the rates that come from the data, packed by
+    column with ``np.packbits``, the other ones being missing or filled.
+    ``_rates`` maps currencies to views on the table that behave like the
+    ``{date: rate}`` dictionaries of CurrencyConverter.
+
+    With ``snapshot=True``, the filled table is also saved in a binary file
+    next to the source file, and loaded from there as long as the source file
+    and the options are the same, which is a lot faster than parsing.
+    With ``mmap=True``, the snapshot is memory mapped read-only instead of
+    being read, so all processes using it share the same physical memory.
+    """
+
+    def __init__(
+        self,
+        currency_file=CURRENCY_FILE,
+        decimal=False,
+        snapshot=False,
+        mmap=False,
+        **kwargs,
+    ):
+        """Instantiate an ArrayCurrencyConverter.
+
+        :param bool snapshot: Set to True to save the parsed rates in a
+            snapshot file next to the local ``currency_file``, and to load
+            them from it next time. Snapshots are rebuilt when the source file
+            or the options change. Default False.
+        :param bool mmap: Set to True to memory map snapshots read-only
+            instead of reading them, this implies ``snapshot=True``. Default
+            False.
+
+        Other parameters are the same as CurrencyConverter, except for
+        ``decimal`` and ``lazy`` which are not supported.
+        """
+        if decimal:
+            raise ValueError("decimal is not supported by ArrayCurrencyConverter")
+        if kwargs.get("lazy"):
+            raise ValueError("lazy is not supported by ArrayCurrencyConverter")
+        self.snapshot = snapshot or mmap
+        self.mmap = mmap
+
+        # Will be filled once the file is loaded
+        self._table = None
+        self._columns = None
+        self._row_bounds = None
+        self._known = None
+        self._first_date = None
+
+        super().__init__(currency_file, decimal=False, **kwargs)
+
+    def load_file(self, currency_file):
+        if not self.snapshot or currency_file.startswith(("http://", "https://")):
+            super().load_file(currency_file)
+            return
+
+        import hashlib
+
+        with open(currency_file, "rb") as f:
+            content = f.read()
+
+        source = hashlib.sha1(content).hexdigest()
+        options = self._snapshot_options()
+        key = hashlib.sha1(json.dumps(options, sort_keys=True).encode()).hexdigest()
+        path = f"{currency_file}.{key[:12]}.snapshot"
+
+        try:
+            self.load_snapshot(path, source=source, options=options)
+        except (OSError, ValueError, KeyError):  # missing or stale snapshot
+            self.load_lines(get_lines(currency_file, content))
+            try:
+                self.save_snapshot(path, source=source)
+            except OSError as e:  # read-only directory for example
+                if self.verbose:
+                    print(rf"/!\ Could not save snapshot {path}: {e}")
+            else:
+                if self.mmap:  # drop the private table for the shared one
+                    self.load_snapshot(path)
+        else:
+            if self.verbose:
+                print(f"Loaded rates from snapshot {path}")
+
+    def _snapshot_options(self):
+        """Options that change the content of the table."""
+        return {
+            "ref_currency": self.ref_currency,
+            "na_values": sorted(self.na_values),
+            "fallback_on_missing_rate": self.fallback_on_missing_rate,
+            "fallback_on_missing_rate_method": self.fallback_on_missing_rate_method,
+        }
+
+    def save_snapshot(self, path, source=None):
+        """Save the loaded rates to a snapshot file.
+
+        :param str path: Path of the snapshot file.
+        :param str source: Identifier of the source data, for example a hash
+            of the source file, to check when loading the snapshot.
+        """
+        header = {
+            "source": source,
+            "options": self._snapshot_options(),
+            "first_date": self._first_date.isoformat(),
+            "columns": list(self._columns),
+            "row_bounds": self._row_bounds.tolist(),
+            "shape": list(self._table.shape),
+            "known_shape": list(self._known.shape),
+        }
+        write_snapshot(path, header, self._table, self._known)
+
+    def load_snapshot(self, path, source=None, options=None):
+        """Load rates from a snapshot file, memory mapped if ``mmap`` is set.
+
+        :param str path: Path of the snapshot file.
+        :param str source: If given, raise ValueError if the snapshot was not
+            built from this source.
+        :param dict options: If given, raise ValueError if the snapshot was not
+            built with these options.
+        """
+        import numpy as np
+
+        header, offset = read_snapshot_header(path)
+        if source is not None and header["source"] != source:
+            raise ValueError(f"{path} was built from another source")
+        if options is not None and header["options"] != options:
+            raise ValueError(f"{path} was built with other options")
+
+        shape = tuple(header["shape"])
+        known_shape = tuple(header["known_shape"])
+        count = shape[0] * shape[1]
+        if self.mmap:
+            table = np.memmap(path, dtype="<f8", mode="r", offset=offset, shape=shape)
+        else:
+            table = np.fromfile(path, dtype="<f8", count=count, offset=offset)
+        known = np.fromfile(
+            path,
+            dtype=np.uint8,
+            count=known_shape[0] * known_shape[1],
+            offset=offset + 8 * count,
+        )
+        self._set_table(
+            table.reshape(shape),
+            parse_date(header["first_date"]),
+            header["columns"],
+            header["row_bounds"],
+            known.reshape(known_shape),
+        )
+
+    def load_lines(self, lines):
+        import numpy as np
+
+        na_values = self.na_values
+
+        lines = iter(lines)
+        header = [currency.strip() for currency in next(lines).strip().split(",")[1:]]
+        kept = [n for n, currency in enumerate(header) if currency]  # skip empty
+
+        dates = []
+        cells = []
+        for line in lines:
+            line = line.strip().split(",")
+            dates.append(parse_date(line[0]))
+            row = line[1:]
+            cells.append(
+                [
+                    row[n] if n < len(row) and row[n] not in na_values else "nan"
+                    for n in kept
+                ]
+            )
+
+        first_date = min(dates)
+        last_date = max(dates)
+        offsets = np.array([(date - first_date).days for date in dates], dtype=np.intp)
+
+        data = np.full((1 + (last_date - first_date).days, len(kept)), np.nan)
+        data[offsets] = np.array(cells, dtype=float).reshape(len(dates), len(kept))
+
+        # Currencies without any rate are dropped, like CurrencyConverter does
+        has_rates = ~np.isnan(data).all(axis=0)
+        currencies = [header[n] for n, keep in zip(kept, has_rates) if keep]
+
+        table = np.ones((data.shape[0], len(currencies) + 1))
+        table[:, :-1] = data[:, has_rates]
+        del data
+
+        self._table = table
+        self._first_date = first_date
+        self._columns = {currency: j for j, currency in enumerate(currencies)}
+        self._columns[self.ref_currency] = len(currencies)
+
+        known = ~np.isnan(table)
+        row_bounds = []
+        for j, currency in enumerate(currencies):
+            valid = np.flatnonzero(known[:, j])
+            row_bounds.append((int(valid[0]), int(valid[-1])))
+            self._fill_missing(currency, *row_bounds[-1])
+
+        row_bounds.append(
+            (
+                min(first_row for first_row, _ in row_bounds),
+                max(last_row for _, last_row in row_bounds),
+            )
+        )
+        self._set_table(
+            table, first_date, list(self._columns), row_bounds, np.packbits(known, 0)
+        )
+
+    def apply_update(self, lines):
+        """Add rates to the loaded ones, see ``CurrencyConverter.apply_update``.
+
+        The table is copied with the new rows and columns, so a memory mapped
+        snapshot is left untouched.
+        """
+        import numpy as np
+
+        update = self._parse_lines(lines)
+        update.pop(self.ref_currency, None)
+        if not update:
+            return
+
+        new_dates = [date for rates in update.values() for date in rates]
+        first_date = min(self._first_date, min(new_dates))
+        shift = (self._first_date - first_date).days
+        old_rows = self._table.shape[0]
+        rows = max(shift + old_rows, 1 + (max(new_dates) - first_date).days)
+
+        currencies = list(self._columns)[:-1]  # the reference currency is last
+        currencies += [currency for currency in update if currency not in self._columns]
+        row_bounds = [
+            (first_row + shift, last_row + shift)
+            for first_row, last_row in self._row_bounds[:-1].tolist()
+        ]
+
+        table = np.full((rows, len(currencies) + 1), np.nan)
+        table[shift : shift + old_rows, : len(row_bounds)] = self._table[:, :-1]
+        table[:, -1] = 1
+        known = np.zeros(table.shape, dtype=bool)
+        old_known = np.unpackbits(self._known, 0, count=old_rows).astype(bool)
+        known[shift : shift + old_rows, : len(row_bounds)] = old_known[:, :-1]
+        known[:, -1] = True
+
+        self._table = table
+        self._first_date = first_date
+        self._columns = {currency: j for j, currency in enumerate(currencies)}
+        self._columns[self.ref_currency] = len(currencies)
+
+        for currency, rates in update.items():
+            j = self._columns[currency]
+            new_rows = np.array([(date - first_date).days for date in rates])
+            table[new_rows, j] = list(rates.values())
+            known[new_rows, j] = True
+
+            # Rows are filled again between the known rates around the new ones
+            valid = np.flatnonzero(known[:, j])
+            i = np.searchsorted(valid, new_rows.min())
+            k = np.searchsorted(valid, new_rows.max(), side="right")
+            first_row, last_row = int(valid[max(i - 1, 0)]), int(
+                valid[min(k, len(valid) - 1)]
+            )
+            span = table[first_row : last_row + 1, j]
+            span[~known[first_row : last_row + 1, j]] = np.nan
+            self._fill_missing(currency, first_row, last_row)
+
+            bounds = (int(valid[0]), int(valid[-1]))
+            if j < len(row_bounds):
+                row_bounds[j] = bounds
+            else:
+                row_bounds.append(bounds)
+
+        row_bounds.append(
+            (
+                min(first_row for first_row, _ in row_bounds),
+                max(last_row for _, last_row in row_bounds),
+            )
+        )
+        self._set_table(
+            table, first_date, list(self._columns), row_bounds, np.packbits(known, 0)
+        )
+
+    def _set_table(self, table, first_date, columns, row_bounds, known):
+        """Set the table of rates, and all the attributes derived from it.
+
+        :param table: The 2-D array of rates, already filled.
+        :param datetime.date first_date: The date of the first row.
+        :param list columns: The currency of each column.
+        :param list row_bounds: The first and last row of each column.
+        :param known: The packed bits of the rates from the data, see ``_known``.
+        """
+        import numpy as np
+
+        self._table = table
+        self._known = known
+        self._first_date = first_date
+        self._columns = {currency: j for j, currency in enumerate(columns)}
+        self._row_bounds = np.array(row_bounds, dtype=np.intp).reshape(-1, 2)
+
+        self.bounds = {
+            currency: Bounds(
+                first_date + timedelta(days=first_row),
+                first_date + timedelta(days=last_row),
+            )
+            for currency, (first_row, last_row) in zip(columns, row_bounds)
+        }
+        self._rates = {
+            currency: _ArrayColumn(table[:, j], first_date, first_row, last_row)
+            for j, (currency, (first_row, last_row)) in enumerate(
+                zip(columns, row_bounds)
+            )
+        }
+        self.currencies = set(columns)
+        self._update_cross_rates()
+
+    def _fill_missing(self, currency, first_row, last_row):
+        """Fill missing rates of a currency within its bounds, if requested.
+
+        :param str currency: The currency to fill missing rates for.
+        :param int first_row: Row of the first available rate.
+        :param int last_row: Row of the last available rate.
+        """
+        import numpy as np
+
+        rates = self._table[first_row : last_row + 1, self._columns[currency]]
+        missing = np.isnan(rates)
+
+        if self.verbose and missing.any():
+            print(
+                f"{currency}: {missing.sum()} missing rates from"
+                f" {self._first_date + timedelta(days=first_row)} to"
+                f" {self._first_date + timedelta(days=last_row)}"
+                f" ({len(rates)} days)"
+            )
+
+        if not self.fallback_on_missing_rate or not missing.any():
+            return
+
+        method = self.fallback_on_missing_rate_method
+        rows = np.arange(len(rates))
+        if method == "linear_interpolation":
+            rates[missing] = np.interp(rows[missing], rows[~missing], rates[~missing])
+        elif method == "last_known":
+            last_known = np.maximum.accumulate(np.where(missing, 0, rows))
+            rates[:] = rates[last_known]
+        else:
+            raise ValueError(f"Unknown fallback method {method!r}")
+
+    def _lookup_columns(self, currencies):
+        """Column of each currency of an array, -1 for unsupported currencies."""
+        import numpy as np
+
+        uniques, inverse = np.unique(currencies, return_inverse=True)
+        columns = np.array(
+            [self._columns.get(c, -1) for c in uniques.tolist()], dtype=np.intp
+        )
+        return columns[inverse.reshape(currencies.shape)]
+
+    def _lookup_rates(self, columns, rows, valid):
+        """Rates at given columns and rows of the table, NaN when not found.
+
+        :param columns: Array of column indexes, -1 for unsupported currencies.
+        :param rows: Array of row indexes, can be outside of the table.
+        :param valid: Boolean array, updated in place to False for rows that
+            are outside of the currency bounds, if not falling back.
+        """
+        import numpy as np
+
+        valid &= columns >= 0
+        columns = np.where(valid, columns, 0)
+        first_rows, last_rows = self._row_bounds[columns].T
+
+        # The reference currency has a rate of 1 whatever the date
+        is_ref = columns == self._columns[self.ref_currency]
+        if self.fallback_on_wrong_date:
+            rows = np.where(is_ref, rows, np.clip(rows, first_rows, last_rows))
+        else:
+            valid &= is_ref | ((first_rows <= rows) & (rows <= last_rows))
+
+        rows = np.clip(rows, 0, len(self._table) - 1)
+        return self._table[rows, columns]
+
+    def convert_many(self, amounts, currencies, new_currencies="EUR", dates=None):
+        """Convert many amounts at once, in a vectorized way.
+
+        Arguments can be arrays or sequences of the same length, or scalars
+        that will be used for every amount. Conversions that cannot be done,
+        because of an unsupported currency or of a missing rate, do not raise
+        but are masked in the result.
+
+        :param amounts: The amounts to convert.
+        :param currencies: The currencies to convert from.
+        :param new_currencies: The currencies to convert to.
+        :param dates: The dates of the conversion rates, as datetime.date,
+            datetime.datetime, numpy.datetime64 or %Y-%m-%d strings. None
+            means the most recent rate of each currency to convert from.
+
+        :return: The converted amounts, with a mask for failed conversions.
+        :rtype: numpy.ma.MaskedArray
+
+        >>> from datetime import date
+        >>> c = ArrayCurrencyConverter()
+        >>> print(c.convert_many([100, 10], ['EUR', 'AAA'], 'USD', date(2014, 3, 28)))
+        [137.59 --]
+        >>> print(c.convert_many(10, 'BGN', 'EUR', [date(2010, 11, 19), date(2010, 11, 21)]))
+        [5.11... --]
+        """
+        import numpy as np
+
+        amounts, currencies, new_currencies, dates = np.broadcast_arrays(
+            np.asarray(amounts, dtype=float),
+            np.asarray(currencies, dtype=str),
+            np.asarray(new_currencies, dtype=str),
+            np.asarray(dates, dtype="datetime64[D]"),
+        )
+
+        columns0 = self._lookup_columns(currencies)
+        columns1 = self._lookup_columns(new_currencies)
+        valid = np.ones(amounts.shape, dtype=bool)
+
+        rows = (dates - np.datetime64(self._first_date, "D")).astype(np.intp)
+        last_rows = self._row_bounds[np.where(columns0 >= 0, columns0, 0), 1]
+        rows = np.where(np.isnat(dates), last_rows, rows)
+
+        r0 = self._lookup_rates(columns0, rows, valid)
+        r1 = self._lookup_rates(columns1, rows, valid)
+
+        with np.errstate(invalid="ignore"):
+            result = amounts / r0 * r1
+        return np.ma.masked_array(result, mask=~valid | np.isnan(result))
+
+    def series(self, currency, new_currency="EUR", start=None, end=None):
+        """Same as ``CurrencyConverter.series``, but as NumPy arrays.
+
+        The dates are a ``datetime64[D]`` array, sliced from the table at once.
+
+        >>> from datetime import date
+        >>> c = ArrayCurrencyConverter()
+        >>> print(c.series('EUR', 'USD', date(2014, 3, 27), date(2014, 3, 30)).rates)
+        [1.3758 1.3759]
+        """
+        import numpy as np
+
+        start, end = self._series_bounds(currency, new_currency, start, end)
+        if start > end:
+            return Series(np.array([], dtype="datetime64[D]"), np.array([]))
+
+        first_row = (start - self._first_date).days
+        rows = slice(first_row, first_row + 1 + (end - start).days)
+        r0 = self._table[rows, self._columns[currency]]
+        r1 = self._table[rows, self._columns[new_currency]]
+        rates = 1 / r0 * r1
+
+        dates = np.arange(len(rates)) + np.datetime64(start, "D")
+        available = ~np.isnan(rates)
+        return Series(dates[available], rates[available])
+
 
 class S3CurrencyConverter(CurrencyConverter):
     """
@@ -7,7 +7,17 @@ import os
 import sys
 import requests
 import time
-from app import app, db, Currency, ExchangeRate
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app import (
+    app, db, Currency, ExchangeRate, Portfolio, CurrencyAlert, SharedConverter, RateCache, HttpClient,
+    SingleFlight, DatabaseLock, FetchLock, RateRefresher, SeriesIndex, AlertEngine,
+    get_exchange_rate, RATE_PIVOT_CURRENCY, rate_cache, portfolio_totals, cross_rate,
+    fetch_exchange_rate, store_pivot_rates, fetch_pivot_rates,
+    check_alerts, get_batch_rates
+)
+import app as app_module
 
 def test_database_setup():
     """Test database initialization and currency loading"""
@@ -80,6 +90,453 @@ def test_web_interface():
             print(f"✗ Main page failed with status {response.status_code}")
             return False
 
+def test_shared_converter():
+    """Test the process-wide fallback converter"""
+    print("\nTesting shared converter...")
+    
+    import shutil
+    import tempfile
+    from currency_converter import SINGLE_DAY_CURRENCY_FILE
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        currency_file = shutil.copy(SINGLE_DAY_CURRENCY_FILE, tmp_dir)
+        shared = SharedConverter(currency_file, check_interval=0)
+        
+        assert not shared.ready.is_set(), "Converter ready before being loaded"
+        
+        converter = shared.get()
+        assert shared.ready.is_set(), "Converter not loaded"
+        assert shared.get() is converter, "Converter is not loaded once and reused"
+        print("✓ Converter loaded once and reused")
+        
+        # Touch the data file to force a reload
+        mtime = os.path.getmtime(currency_file) + 10
+        os.utime(currency_file, (mtime, mtime))
+        assert shared.get() is not converter, "Converter not reloaded after data file change"
+        print("✓ Converter reloaded after data file change")
+    
+    with app.test_client() as client:
+        response = client.get('/api/ready')
+        status = response.status_code
+        assert status in (200, 503), f"/api/ready failed with status {status}"
+        print(f"✓ /api/ready returned {response.get_json()}")
+    
+    return True
+
+def test_rate_cache():
+    """Test the in-process rate cache"""
+    print("\nTesting rate cache...")
+    
+    cache = RateCache(ttl=0.05, max_size=2, stale_ttl=0)
+    cache.set(('USD', 'EUR'), 0.9)
+    cache.set(('USD', 'GBP'), 0.8)
+    assert cache.get(('USD', 'EUR')) == (0.9, True), "Cached rate not returned"
+    
+    # USD/GBP is the least recently used entry
+    cache.set(('USD', 'JPY'), 150.0)
+    assert cache.get(('USD', 'GBP')) is None, "Least recently used entry not evicted"
+    assert cache.get(('USD', 'EUR')) is not None, "Recently used entry evicted"
+    print("✓ Least recently used entry evicted")
+    
+    time.sleep(0.1)
+    assert cache.get(('USD', 'EUR')) is None, "Expired entry returned"
+    print("✓ Expired entry dropped")
+    
+    cache = RateCache(ttl=0, max_size=2, stale_ttl=60)
+    cache.set(('USD', 'EUR'), 0.9)
+    assert cache.get(('USD', 'EUR')) == (0.9, False), "Stale entry not returned"
+    print("✓ Stale entry returned for revalidation")
+    
+    stats = cache.stats()
+    assert stats['stale_hits'] == 1 and stats['size'] == 1, f"Wrong cache stats: {stats}"
+    print(f"✓ Cache stats: {stats}")
+    return True
+
+def test_cross_rates():
+    """Test cross rates derived from the pivot currency"""
+    print("\nTesting cross rates...")
+    
+    pivot_rates = {'EUR': 0.8, 'GBP': 0.5}
+    assert abs(cross_rate(pivot_rates, 'EUR', 'GBP') - 0.625) <= 1e-9, "Wrong cross rate"
+    inverse_rate = cross_rate(pivot_rates, 'GBP', RATE_PIVOT_CURRENCY)
+    assert abs(inverse_rate - 2.0) <= 1e-9, "Wrong inverse rate"
+    assert cross_rate(pivot_rates, 'EUR', 'AAA') is None, "Cross rate without pivot rate"
+    print("✓ Cross and inverse rates derived from pivot rates")
+    
+    # Pivot rates in memory serve every pair without any query
+    for currency, rate in pivot_rates.items():
+        rate_cache.set((RATE_PIVOT_CURRENCY, currency), rate)
+    try:
+        with app.app_context():
+            rate = fetch_exchange_rate('GBP', 'EUR')
+    finally:
+        for currency in pivot_rates:
+            rate_cache.invalidate((RATE_PIVOT_CURRENCY, currency))
+    
+    assert abs(rate - 1.6) <= 1e-9, f"Wrong rate from cached pivot rates: {rate}"
+    print("✓ Pair rate derived from cached pivot rates")
+    return True
+
+def test_batch_rates():
+    """Test the batch rates endpoint"""
+    print("\nTesting batch rates...")
+    
+    with app.test_client() as client:
+        response = client.get('/api/rates/batch?base=USD&targets=EUR,GBP,AAA')
+        assert response.status_code == 200, f"/api/rates/batch failed with status {response.status_code}"
+        
+        data = response.get_json()
+        assert set(data['rates']) == {'EUR', 'GBP'}, f"Unexpected batch rates: {data}"
+        assert data['missing'] == ['AAA'], f"Unexpected missing rates: {data}"
+        print(f"✓ /api/rates/batch returned {data['rates']}")
+        
+        single = client.get('/api/rates/USD/GBP').get_json()
+        assert abs(single['rate'] - data['rates']['GBP']) < 1e-9, "Batch rate differs from single rate"
+        print("✓ Batch rates match single rates")
+    
+    # All the cryptocurrency targets are priced with one API call
+    calls = []
+    def get_crypto_rates(crypto_currencies, fiat_currency='USD'):
+        calls.append((crypto_currencies, fiat_currency))
+        return {currency: 1000.0 for currency in crypto_currencies}
+    
+    original = app_module.get_crypto_rates
+    app_module.get_crypto_rates = get_crypto_rates
+    try:
+        with app.app_context():
+            rates = get_batch_rates('USD', ['BTC', 'ETH', 'EUR'])
+    finally:
+        app_module.get_crypto_rates = original
+    assert calls == [(['BTC', 'ETH'], 'USD')], f"Crypto API calls: {calls}"
+    assert rates['BTC'] == rates['ETH'] == 0.001 and 'EUR' in rates, rates
+    print("✓ Cryptocurrency targets priced with one API call")
+    
+    return True
+
+class StubUpstreamHandler(BaseHTTPRequestHandler):
+    """Slow local stand-in for the upstream rate APIs"""
+    protocol_version = 'HTTP/1.1'
+    paths = []
+
+    def do_GET(self):
+        self.paths.append(self.path)
+        time.sleep(0.2)
+        body = json.dumps({'bitcoin': {'usd': 50000.0}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_http_client():
+    """Test the pooled upstream HTTP client against a stub server"""
+    print("\nTesting upstream HTTP client...")
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubUpstreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = HttpClient(pool_size=2)
+        url = f"http://127.0.0.1:{server.server_port}/simple/price?ids=bitcoin"
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(client.get_json(url)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(results) == 5, "Wrong responses from stub server"
+        assert all(r['bitcoin']['usd'] == 50000.0 for r in results), "Wrong responses"
+        requests_sent = len(StubUpstreamHandler.paths)
+        assert requests_sent == 1, f"{requests_sent} upstream requests for one URL"
+        print("✓ Concurrent identical requests coalesced")
+        
+        client.get_json(url)
+        assert len(StubUpstreamHandler.paths) == 2, "Sequential request not sent"
+        print("✓ Sequential request sent over the pooled session")
+        return True
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_single_flight():
+    """Test that concurrent fetches of the same rate share one call"""
+    print("\nTesting single-flight fetches...")
+    
+    calls = []
+    def fetch(pair):
+        calls.append(pair)
+        time.sleep(0.2)
+        return 0.9
+    
+    flights = SingleFlight()
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do(('USD', 'EUR'), fetch, ('USD', 'EUR'))))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert results == [0.9] * 5, results
+    assert len(calls) == 1, f"{len(calls)} fetches for 5 concurrent misses"
+    print("✓ Concurrent misses share one fetch")
+    
+    with app.app_context():
+        # Databases created before the lock table get it on first use
+        FetchLock.__table__.drop(db.engine, checkfirst=True)
+        DatabaseLock.table_created = False
+        lock = DatabaseLock('test-lock', timeout=0.2)
+        assert lock.acquire(), "Free database lock not acquired"
+        assert not DatabaseLock('test-lock').acquire(), "Database lock acquired twice"
+        assert lock.wait(), "Expired database lock not waited for"
+        assert DatabaseLock('test-lock').acquire(), "Expired database lock not taken over"
+        lock.release()
+        assert lock.acquire(), "Released database lock not acquired"
+        lock.release()
+        print("✓ Database lock held by one process at a time")
+    
+    return True
+
+def test_rate_refresher():
+    """Test the background rate refresher"""
+    print("\nTesting rate refresher...")
+    
+    refresher = RateRefresher(pairs=[('EUR', 'USD')], max_pairs=2, jitter=0, retry_delay=1)
+    for pair in [('USD', 'GBP'), ('USD', 'JPY'), ('BTC', 'USD')]:
+        refresher.record(pair)
+    expected = [('EUR', 'USD'), ('USD', 'JPY'), ('BTC', 'USD')]
+    assert refresher.pairs() == expected, f"Wrong pairs learned from traffic: {refresher.pairs()}"
+    print("✓ Recently requested pairs learned")
+    
+    calls = []
+    def refresh(pairs):
+        calls.append(pairs)
+        if len(calls) == 1:
+            raise RuntimeError("upstream down")
+    
+    refresher.add_job('test', refresh, interval=60)
+    refresher.run_pending()
+    job = refresher.jobs[0]
+    assert job['failures'] == 1, "Failure of the job not counted"
+    assert refresher.next_delay(job) == 1, "Failed job not retried with backoff"
+    print("✓ Failed job retried with backoff")
+    
+    job['next_run'] = 0.0
+    delay = refresher.run_pending()
+    assert job['failures'] == 0 and len(calls) == 2, "Job not run again"
+    assert 59 < delay <= 60, f"Job not rescheduled after success: {delay}"
+    print("✓ Job rescheduled after success")
+    
+    # Handlers read the crypto rates kept fresh by the refresher
+    rate_cache.set(('BTC', 'USD'), 50000.0)
+    try:
+        assert get_exchange_rate('BTC', 'USD') == 50000.0, "Refreshed crypto rate not used"
+    finally:
+        rate_cache.invalidate(('BTC', 'USD'))
+    print("✓ Refreshed crypto rate used without calling the API")
+    
+    return True
+
+def test_series_index():
+    """Test the chart and history endpoints served from the series index"""
+    print("\nTesting series index...")
+    
+    index = SeriesIndex(windows=(7, 365), max_points=10)
+    windows = [index.window(days) for days in (3, 30, 1000)]
+    assert windows == [7, 365, 365], f"Wrong windows for the requested days: {windows}"
+    
+    with app.app_context():
+        points, etag = index.get('EUR', 'USD', 365)
+        assert index.get('EUR', 'USD', 365) == (points, etag), "Series changed"
+        assert index.stats()['hits'] == 1, "Series not served from the index"
+    days = [day for day, _ in points]
+    assert 0 < len(points) <= 10 and days == sorted(days), f"Wrong downsampled series: {points}"
+    print(f"✓ 365 days downsampled to {len(points)} points, from {days[0]} to {days[-1]}")
+    
+    with app.test_client() as client:
+        response = client.get('/api/chart-data/EUR/USD?days=30')
+        data = response.get_json()
+        assert response.status_code == 200, f"/api/chart-data failed: {data}"
+        rates = data['data']
+        assert rates and len(data['labels']) == len(rates), f"Wrong chart data: {data}"
+        assert len(set(rates)) > 1 or len(rates) <= 3, "Chart data is not the real history"
+        print(f"✓ /api/chart-data returned {len(data['data'])} real rates")
+        
+        cached = client.get('/api/chart-data/EUR/USD?days=30', headers={'If-None-Match': response.headers['ETag']})
+        assert cached.status_code == 304, f"ETag not honoured, status {cached.status_code}"
+        print("✓ Unchanged chart data answered with 304")
+        
+        history = client.get('/api/history/EUR/USD?days=30').get_json()
+        assert [point['rate'] for point in history] == rates, "History differs from chart data"
+        print("✓ /api/history matches the chart data")
+    
+    return True
+
+def test_portfolio_valuation():
+    """Test the paginated portfolio valuation with one rate lookup per currency"""
+    print("\nTesting portfolio valuation...")
+    
+    user_id = 'test-portfolio-valuation'
+    pivot_rates = {'EUR': 0.8, 'GBP': 0.5}
+    for currency, rate in pivot_rates.items():
+        rate_cache.set((RATE_PIVOT_CURRENCY, currency), rate)
+    
+    try:
+        with app.app_context():
+            db.session.add_all([
+                Portfolio(user_id=user_id, currency_code='EUR' if i % 2 else 'GBP', amount=10, purchase_rate=1.5)
+                for i in range(250)
+            ])
+            db.session.commit()
+        
+        with app.test_client() as client:
+            data = client.get(f'/api/portfolio/{user_id}?page=3&per_page=100').get_json()
+            page = (len(data['portfolio']), data['total_items'], data['pages'])
+            assert page == (50, 250, 3), f"Wrong page: {page}"
+            print("✓ Third page of 250 lots has 50 lots")
+            
+            # 125 lots of 10 EUR at 1.25 USD, and 125 lots of 10 GBP at 2 USD
+            value, profit_loss = data['total_value_usd'], data['total_profit_loss_usd']
+            assert abs(value - 4062.5) <= 1e-6, f"Wrong total value: {value}"
+            assert abs(profit_loss - 312.5) <= 1e-6, f"Wrong total profit/loss: {profit_loss}"
+            rates = {item['current_rate'] for item in data['portfolio']}
+            assert rates == {1.25, 2.0}, f"Wrong rates of the lots: {rates}"
+            print(f"✓ Portfolio valued at {data['total_value_usd']} USD from the cached totals")
+            
+            client.post('/api/portfolio', json={
+                'user_id': user_id, 'currency_code': 'EUR', 'amount': 100, 'purchase_rate': 1
+            })
+            data = client.get(f'/api/portfolio/{user_id}').get_json()
+            assert data['total_items'] == 251, "Cached totals not updated after adding a lot"
+            assert len(data['portfolio']) == 100, f"Wrong first page: {len(data['portfolio'])} lots"
+            print("✓ Cached totals updated after adding a lot")
+    finally:
+        with app.app_context():
+            Portfolio.query.filter_by(user_id=user_id).delete()
+            db.session.commit()
+        portfolio_totals.invalidate(user_id)
+        for currency in pivot_rates:
+            rate_cache.invalidate((RATE_PIVOT_CURRENCY, currency))
+    
+    return True
+
+def test_alert_engine():
+    """Test the batched evaluation of currency alerts"""
+    print("\nTesting alert engine...")
+    
+    user_id = 'test-alert-engine'
+    engine = AlertEngine(update_chunk_size=2)
+    try:
+        with app.app_context():
+            alerts = [
+                CurrencyAlert(user_id=user_id, from_currency='EUR', to_currency='USD', target_rate=target, alert_type=alert_type)
+                for target, alert_type in [(1.1, 'above'), (1.2, 'above'), (1.3, 'above'), (1.0, 'below'), (0.9, 'below')]
+            ]
+            db.session.add_all(alerts)
+            db.session.commit()
+            ids = [alert.id for alert in alerts]
+            
+            engine.sync()
+            assert ('EUR', 'USD') in engine.pairs(), "Active alerts not loaded"
+            
+            triggered = engine.evaluate({('EUR', 'USD'): 1.2, ('GBP', 'USD'): 1.5})
+            assert sorted(triggered) == ids[:2], f"Wrong alerts triggered above: {triggered}"
+            assert not engine.evaluate({('EUR', 'USD'): 1.2}), "Alerts triggered twice"
+            print("✓ Alerts above the rate triggered once")
+            
+            assert sorted(engine.evaluate({('EUR', 'USD'): 0.95})) == [ids[3]], "Wrong alerts triggered below"
+            print("✓ Alerts below the rate triggered")
+            
+            db.session.expire_all()
+            rows = CurrencyAlert.query.filter_by(user_id=user_id, is_active=False).all()
+            assert sorted(row.id for row in rows) == sorted(ids[:2] + [ids[3]]), "Triggered alerts not updated in the database"
+            assert all(row.triggered_at is not None for row in rows), "Trigger time not stored"
+            print("✓ Triggered alerts updated in bulk")
+            
+            alert = CurrencyAlert(user_id=user_id, from_currency='EUR', to_currency='USD', target_rate=0.95, alert_type='below')
+            db.session.add(alert)
+            db.session.commit()
+            engine.sync()
+            assert sorted(engine.evaluate({('EUR', 'USD'): 0.8})) == [ids[4], alert.id], "New alert not loaded"
+            assert engine.stats()['active'] == 1, f"Wrong alerts left: {engine.stats()}"
+            print("✓ New alerts loaded incrementally")
+            
+            # Alerts are checked when the rates are refreshed, not when they are stored or read
+            alert = CurrencyAlert(user_id=user_id, from_currency='XAA', to_currency='XBB', target_rate=1.5, alert_type='above')
+            db.session.add(alert)
+            db.session.commit()
+            store_pivot_rates({'XAA': 2.0, 'XBB': 4.0})
+            db.session.expire_all()
+            assert db.session.get(CurrencyAlert, alert.id).is_active, "Alert triggered by stored rates"
+            
+            class StubClient:
+                def get_json(self, url):
+                    return {'result': 'success', 'conversion_rates': {'XAA': 2.0, 'XBB': 4.0}}
+            
+            http_client = app_module.http_client
+            app_module.http_client = StubClient()
+            try:
+                fetch_pivot_rates()
+            finally:
+                app_module.http_client = http_client
+            db.session.expire_all()
+            assert not db.session.get(CurrencyAlert, alert.id).is_active, "Alert not triggered by fetched rates"
+            print("✓ Alerts triggered by fetched rates")
+            
+            # A failed evaluation leaves the session of the caller alone
+            pending = CurrencyAlert(user_id=user_id, from_currency='EUR', to_currency='USD', target_rate=2.0, alert_type='above')
+            db.session.add(pending)
+            check_alerts(lambda pair: 1 / 0)
+            assert pending in db.session.new, "Pending changes rolled back"
+            db.session.commit()
+            print("✓ Session kept on alert errors")
+    finally:
+        with app.app_context():
+            CurrencyAlert.query.filter_by(user_id=user_id).delete()
+            ExchangeRate.query.filter(ExchangeRate.to_currency.in_(['XAA', 'XBB'])).delete()
+            db.session.commit()
+        for currency in ('XAA', 'XBB'):
+            rate_cache.invalidate((RATE_PIVOT_CURRENCY, currency))
+    
+    return True
+
+def test_bulk_convert():
+    """Test the streamed bulk conversion with one rate lookup per pair and date"""
+    print("\nTesting bulk conversion...")
+    
+    rate_cache.set(('USD', 'EUR'), 0.5)
+    try:
+        with app.test_client() as client:
+            body = 'amount,from_currency,to_currency,date\n' + '10,usd,EUR\n' * 2500 + 'x,USD,EUR\n1,USD,ZZZ\n2,USD,EUR,2014-03-28\n'
+            response = client.post('/api/convert/bulk', data=body, content_type='text/csv')
+            rows = response.get_data(as_text=True).splitlines()
+            assert response.mimetype == 'text/csv', response.mimetype
+            assert len(rows) == 2504, f"Wrong CSV response: {len(rows)} rows"
+            assert rows[1] == '2,10.0,USD,EUR,,0.5,5.0,', rows[1]
+            assert rows[-3].startswith('2502,') and 'Invalid record' in rows[-3], rows[-3]
+            assert 'ZZZ' in rows[-2], rows[-2]
+            assert rows[-1].startswith('2504,2.0,USD,EUR,2014-03-28,0.72'), f"Wrong historical result: {rows[-1]}"
+            print(f"✓ {len(rows) - 1} CSV records converted, with errors per record")
+            
+            body = '{"amount": 4, "from_currency": "USD", "to_currency": "EUR"}\n\nnot json\n'
+            response = client.post('/api/convert/bulk', data=body, content_type='application/x-ndjson')
+            results = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            assert results[0]['result'] == 2.0, results
+            assert 'error' in results[1] and results[1]['line'] == 3, f"Wrong line after a blank one: {results}"
+            print("✓ NDJSON records converted, errors numbered by their line")
+    finally:
+        rate_cache.invalidate(('USD', 'EUR'))
+    
+    return True
+
 def main():
     """Run all tests"""
     print("Currency Converter Web Application - Test Suite")
@@ -91,7 +548,18 @@ def main():
     tests = [
         ("Database Setup", test_database_setup),
         ("API Endpoints", test_api_endpoints),
-        ("Web Interface", test_web_interface)
+        ("Web Interface", test_web_interface),
+        ("Shared Converter", test_shared_converter),
+        ("Rate Cache", test_rate_cache),
+        ("Cross Rates", test_cross_rates),
+        ("Batch Rates", test_batch_rates),
+        ("HTTP Client", test_http_client),
+        ("Single Flight", test_single_flight),
+        ("Rate Refresher", test_rate_refresher),
+        ("Series Index", test_series_index),
+        ("Portfolio Valuation", test_portfolio_valuation),
+        ("Alert Engine", test_alert_engine),
+        ("Bulk Conversion", test_bulk_convert)
     ]
     
     passed = 0
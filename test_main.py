@@ -3,10 +3,13 @@
 from decimal import Decimal
 from datetime import datetime, date, timedelta
 from io import StringIO
+import json
+import shutil
 
 import pytest
 from pytest import approx
 from currency_converter import (
+    ArrayCurrencyConverter,
     CurrencyConverter,
     S3CurrencyConverter,
     RateNotFoundError,
@@ -15,6 +18,8 @@ from currency_converter import (
     SINGLE_DAY_ECB_URL,
     SINGLE_DAY_CURRENCY_FILE,
 )
+from currency_converter.currency_converter import cache_info, memoize, parse_date
+from currency_converter.__main__ import main
 
 c0 = CurrencyConverter()
 c1 = CurrencyConverter(fallback_on_missing_rate=True)
@@ -30,22 +35,39 @@ c4 = CurrencyConverter(
     fallback_on_missing_rate_method="last_known",
 )
 c5 = CurrencyConverter(CURRENCY_FILE)
+a0 = ArrayCurrencyConverter()
+a1 = ArrayCurrencyConverter(fallback_on_missing_rate=True)
+a2 = ArrayCurrencyConverter(fallback_on_wrong_date=True)
+a3 = ArrayCurrencyConverter(
+    fallback_on_missing_rate=True,
+    fallback_on_wrong_date=True,
+    fallback_on_missing_rate_method="linear_interpolation",
+)
+a4 = ArrayCurrencyConverter(
+    fallback_on_missing_rate=True,
+    fallback_on_wrong_date=True,
+    fallback_on_missing_rate_method="last_known",
+)
+l0 = CurrencyConverter(lazy=True)
+l3 = CurrencyConverter(
+    fallback_on_missing_rate=True, fallback_on_wrong_date=True, lazy=True
+)
 
-converters = [c0, c1, c2, c3, c4, c5]
-converters_with_missing_rate_fallback = [c1, c3, c4]
-converters_with_wrong_date_fallback = [c2, c3, c4]
-converters_without_missing_rate_fallback = [c0, c2, c5]
-converters_without_wrong_date_fallback = [c0, c1, c5]
+converters = [c0, c1, c2, c3, c4, c5, a0, a1, a2, a3, a4, l0, l3]
+converters_with_missing_rate_fallback = [c1, c3, c4, a1, a3, a4, l3]
+converters_with_wrong_date_fallback = [c2, c3, c4, a2, a3, a4, l3]
+converters_without_missing_rate_fallback = [c0, c2, c5, a0, a2, l0]
+converters_without_wrong_date_fallback = [c0, c1, c5, a0, a1, l0]
 
 
-@pytest.fixture
-def fallback_with_linear_interpolation():
-    return c3
+@pytest.fixture(params=[c3, a3])
+def fallback_with_linear_interpolation(request):
+    return request.param
 
 
-@pytest.fixture
-def fallback_with_last_known():
-    return c4
+@pytest.fixture(params=[c4, a4])
+def fallback_with_last_known(request):
+    return request.param
 
 
 @pytest.fixture
@@ -221,16 +243,14 @@ class TestCustomObject:
         currency_file=None, fallback_on_wrong_date=True, fallback_on_missing_rate=True
     )
 
-    c.load_lines(
-        StringIO(
-            """\
+    lines = """\
     Date,USD,AAA,
     2014-03-29,2,N/A
     2014-03-27,6,0
     2014-03-23,18,N/A
     2014-03-22,N/A,0"""
-        )
-    )
+
+    c.load_lines(StringIO(lines))
 
     def test_convert(self):
         assert self.c.convert(10, "EUR", "USD") == approx(20)
@@ -264,11 +284,475 @@ class TestCustomObject:
         }
 
 
+class TestArrayCustomObject(TestCustomObject):
+    c = ArrayCurrencyConverter(
+        currency_file=None, fallback_on_wrong_date=True, fallback_on_missing_rate=True
+    )
+
+    c.load_lines(StringIO(TestCustomObject.lines))
+
+
+class TestMemoize:
+    def test_bounded(self):
+        calls = []
+
+        @memoize(maxsize=2)
+        def double(x):
+            calls.append(x)
+            return 2 * x
+
+        assert [double(1), double(2), double(1), double(3)] == [2, 4, 2, 6]
+        assert calls == [1, 2, 3]
+        assert double.cache_info().currsize == 2
+        assert double(2) == 4  # evicted as the least recently used
+        assert calls == [1, 2, 3, 2]
+
+    def test_cache_info(self):
+        parse_date("2014-03-28")
+        info = cache_info()["parse_date"]
+        assert info["hits"] + info["misses"] > 0
+        assert 0 < info["currsize"] <= info["maxsize"]
+
+
+class TestSortedStorage:
+    def test_only_available_rates(self):
+        rates = TestCustomObject.c._rates["USD"]
+        assert rates.dates == [date(2014, 3, 23), date(2014, 3, 27), date(2014, 3, 29)]
+        assert rates.rates == [18, 6, 2]
+
+    def test_missing_rates(self):
+        assert date(2014, 3, 28) in c0._rates["USD"]
+        assert date(1986, 2, 2) not in c0._rates["USD"]
+        assert c0._rates["BGN"][date(2010, 11, 21)] is None
+        assert (
+            c4._rates["BGN"][date(2010, 11, 21)] == c4._rates["BGN"][date(2010, 11, 19)]
+        )
+
+    def test_update_sorted(self):
+        c = CurrencyConverter(currency_file=None)
+        c.load_lines(StringIO(TestCustomObject.lines))
+        c.apply_update(StringIO("Date,USD\n2014-03-25,10\n2014-03-30,1"))
+        assert c._rates["USD"].dates == [
+            date(2014, 3, 23),
+            date(2014, 3, 25),
+            date(2014, 3, 27),
+            date(2014, 3, 29),
+            date(2014, 3, 30),
+        ]
+        assert c._rates["USD"].rates == [18, 10, 6, 2, 1]
+
+
+class TestLazy:
+    def test_same_as_eager(self):
+        c = CurrencyConverter(lazy=True)
+        assert c.currencies == c0.currencies
+        assert c.bounds == c0.bounds
+        assert c.convert(10, "EUR", "USD", date(2013, 3, 21)) == approx(12.91)
+
+    def test_parsed_on_first_access(self):
+        c = CurrencyConverter(lazy=True)
+        assert not dict.__contains__(c._rates, "USD")
+        assert "USD" in c._rates
+        c.convert(10, "EUR", "USD")
+        assert dict.__contains__(c._rates, "USD")
+        assert c._rates["USD"].rates == c0._rates["USD"].rates
+        assert not dict.__contains__(c._rates, "JPY")
+
+    def test_lines_released(self):
+        c = CurrencyConverter(currency_file=None, lazy=True)
+        c.load_lines(StringIO(TestCustomObject.lines))
+        assert c.bounds == TestCustomObject.c.bounds
+        c.convert(10, "USD", "AAA", date(2014, 3, 27))
+        assert c._rates.lines is None
+
+    def test_update(self):
+        c = CurrencyConverter(currency_file=None, lazy=True)
+        c.load_lines(StringIO(TestCustomObject.lines))
+        c.apply_update(StringIO(TestUpdate.update))
+        assert c.bounds["USD"] == (date(2014, 3, 23), date(2014, 4, 2))
+        assert c.convert(10, "EUR", "USD", date(2014, 4, 2)) == approx(100)
+
+    def test_not_supported_by_array(self):
+        with pytest.raises(ValueError):
+            ArrayCurrencyConverter(lazy=True)
+
+
+class TestFixedPoint:
+    def test_converted_on_first_use(self, decimal_converter):
+        rates = decimal_converter._rates["USD"]
+        assert rates.rates[:2] == ["1.1789", "1.179"]
+        assert rates.fixed_point()[0] == 4
+        assert rates.fixed_point()[1][:2] == [11789, 11790]
+        assert rates[date(1999, 1, 5)] == Decimal("1.179")
+
+    def test_same_as_decimal(self):
+        c = CurrencyConverter(currency_file=None, decimal=True)
+        c.load_lines(StringIO("Date,USD,JPY\n2014-03-29,1.5,140\n2014-03-27,0.25,"))
+        assert c._rates["USD"].fixed_point() == (2, [25, 150])
+        assert repr(c._rates["USD"][date(2014, 3, 27)]) == "Decimal('0.25')"
+        assert repr(c._rates["JPY"][date(2014, 3, 29)]) == "Decimal('140')"
+
+    def test_linear_interpolation(self):
+        c = CurrencyConverter(
+            currency_file=None, decimal=True, fallback_on_missing_rate=True
+        )
+        c.load_lines(StringIO("Date,USD\n2014-03-29,0.3\n2014-03-26,0.1"))
+        assert c._rates["USD"][date(2014, 3, 27)] == Decimal("0.5") / 3
+        assert c._rates["USD"][date(2014, 3, 28)] == Decimal("0.7") / 3
+
+    def test_not_fixed_point(self):
+        c = CurrencyConverter(currency_file=None, decimal=True)
+        c.load_lines(
+            StringIO("Date,USD\n2014-03-29,1E-3\n2014-03-27,0.1234567890123456")
+        )
+        assert c._rates["USD"].fixed_point() == (
+            0,
+            [Decimal("0.1234567890123456"), Decimal("1E-3")],
+        )
+        assert c.convert(1, "EUR", "USD", date(2014, 3, 29)) == Decimal("0.001")
+
+    def test_update(self):
+        c = CurrencyConverter(currency_file=None, decimal=True)
+        c.load_lines(StringIO("Date,USD\n2014-03-27,1.5"))
+        assert c._rates["USD"][date(2014, 3, 27)] == Decimal("1.5")
+        c.apply_update(StringIO("Date,USD\n2014-03-28,1.25"))
+        assert c._rates["USD"].fixed_point() == (2, [150, 125])
+        assert c.convert(2, "EUR", "USD", date(2014, 3, 28)) == Decimal("2.5")
+
+
+def tolist(values):
+    """List of the values of a series, also when they are NumPy arrays."""
+    return values.tolist() if hasattr(values, "tolist") else values
+
+
+class TestSeries:
+    @pytest.mark.parametrize("c", converters)
+    def test_same_as_convert(self, c):
+        start, end = date(2010, 11, 15), date(2010, 12, 5)
+        for pair in ("USD", "BGN"), ("EUR", "BGN"), ("BGN", "EUR"):
+            dates, rates = c.series(*pair, start, end)
+            assert len(dates) == len(rates) > 0
+            for d, rate in zip(tolist(dates), tolist(rates)):
+                assert rate == approx(c.convert(1, *pair, d))
+
+    @pytest.mark.parametrize("c", converters_with_missing_rate_fallback)
+    def test_every_day(self, c):
+        dates, _ = c.series("USD", "BGN", date(2010, 11, 15), datetime(2010, 12, 5))
+        assert len(dates) == 21
+
+    @pytest.mark.parametrize("c", converters_without_missing_rate_fallback)
+    def test_available_days(self, c):
+        dates, _ = c.series("USD", "BGN", date(2010, 11, 15), date(2010, 12, 5))
+        assert len(dates) == 15
+        assert date(2010, 11, 21) not in tolist(dates)
+
+    @pytest.mark.parametrize("c", [c0, a1])
+    def test_bounds(self, c):
+        dates, _ = c.series("BGN", "USD", end=date(2000, 7, 20))
+        assert [d.isoformat() for d in tolist(dates)] == ["2000-07-19", "2000-07-20"]
+        assert len(c.series("USD", start=c.bounds["USD"].last_date).dates) == 1
+        assert len(c.series("USD", "BGN", date(2000, 7, 18), date(2000, 7, 1))[0]) == 0
+        with pytest.raises(ValueError):
+            c.series("USD", "AAA")
+
+    @pytest.mark.parametrize("c", converters)
+    def test_reference_currency(self, c):
+        dates, rates = c.series("EUR", "EUR", date(2014, 3, 27), date(2014, 3, 30))
+        assert [d.isoformat() for d in tolist(dates)] == [
+            "2014-03-27",
+            "2014-03-28",
+            "2014-03-29",
+            "2014-03-30",
+        ]
+        assert tolist(rates) == [1, 1, 1, 1]
+
+    def test_decimal(self, decimal_converter):
+        s = decimal_converter.series("EUR", "USD", date(2013, 3, 21), date(2013, 3, 21))
+        assert s.rates == [Decimal("1.2910")]
+
+    def test_array(self):
+        s = a0.series("USD", "EUR", date(2014, 3, 28), date(2014, 3, 28))
+        assert str(s.dates.dtype) == "datetime64[D]"
+        assert s.rates == approx([1 / 1.3759])
+
+
+class TestCrossRates:
+    @pytest.fixture(params=[CurrencyConverter, ArrayCurrencyConverter])
+    def c(self, request):
+        c = request.param(currency_file=None)
+        c.load_lines(StringIO(TestCustomObject.lines))
+        return c
+
+    def test_same_as_convert(self, c):
+        expected = c.convert(10, "USD", "EUR")
+        c.precompute_cross_rates(dates=[None, date(2014, 3, 27)])
+        assert set(c._cross_rates) == {None, date(2014, 3, 27)}
+        assert ("USD", "EUR") in c._cross_rates[None]
+        assert c.convert(10, "USD", "EUR") == expected
+        assert c.convert(10, "EUR", "USD", datetime(2014, 3, 27)) == approx(60)
+
+    def test_missing_pairs(self, c):
+        c.precompute_cross_rates(["USD", "AAA", "BBB"], [date(2014, 3, 23)])
+        assert set(c._cross_rates[date(2014, 3, 23)]) == {("USD", "USD")}
+        with pytest.raises(RateNotFoundError):
+            c.convert(10, "USD", "AAA", date(2014, 3, 23))
+
+    def test_rebuilt_on_update(self, c):
+        c.precompute_cross_rates(["EUR", "USD"])
+        cross_rates = c._cross_rates
+        c.apply_update(StringIO(TestUpdate.update))
+        assert c._cross_rates is not cross_rates
+        assert c.convert(10, "EUR", "USD") == approx(100)
+
+    def test_decimal(self):
+        c = CurrencyConverter(decimal=True)
+        c.precompute_cross_rates(["EUR", "USD"], [date(2013, 3, 21)])
+        assert c.convert(100, "EUR", "USD", date(2013, 3, 21)) == Decimal("129.100")
+
+
+class TestBatch:
+    records = "amount,currency,to,date\n100,EUR,USD,2014-03-28\n10,USD\nx,USD\n"
+
+    @pytest.fixture
+    def batch_file(self, tmp_path):
+        path = tmp_path / "records.csv"
+        path.write_text(self.records)
+        return str(path)
+
+    def test_csv(self, batch_file, capsys):
+        assert main(["--batch", batch_file]) == 1
+        out, err = capsys.readouterr()
+        lines = out.splitlines()
+        assert len(lines) == 2
+        assert lines[0].startswith("100,EUR,137.5")
+        assert lines[0].endswith(",USD,2014-03-28")
+        assert float(lines[1].split(",")[2]) == approx(c0.convert(10, "USD"))
+        assert err == "line 4: could not convert string to float: 'x'\n"
+
+    @pytest.mark.parametrize("decimal", [False, True])
+    def test_jsonl(self, monkeypatch, capsys, decimal):
+        records = (
+            '{"amount": 100.10, "currency": "EUR", "to": "USD", "date": "2014-03-28"}'
+        )
+        monkeypatch.setattr("sys.stdin", StringIO(records + "\n"))
+        options = ["--decimal"] if decimal else []
+        assert main(["--batch", "--format", "jsonl", *options]) == 0
+        out = capsys.readouterr().out
+        assert out.startswith('{"amount": 100.10, ')
+        record = json.loads(out, parse_float=Decimal)
+        assert isinstance(record["new_amount"], Decimal)
+        if decimal:
+            assert record["new_amount"] == Decimal("137.72759")
+        else:
+            assert float(record["new_amount"]) == approx(137.72759)
+        assert record["date"] == "2014-03-28"
+
+    def test_line_numbers(self, monkeypatch, capsys):
+        records = '{"amount": 1, "currency": "USD"}\n\n{"amount": 1}\n'
+        monkeypatch.setattr("sys.stdin", StringIO(records))
+        assert main(["--batch", "--format", "jsonl"]) == 1
+        assert capsys.readouterr().err == "line 3: missing 'currency'\n"
+
+    def test_jobs(self, batch_file, capsys):
+        main(["--batch", batch_file])
+        expected = capsys.readouterr()
+        main(["--batch", batch_file, "--jobs", "2"])
+        assert capsys.readouterr() == expected
+
+
+class TestLatest:
+    def test_same_as_history(self, monkeypatch, capsys):
+        last_date = str(c0.bounds["USD"].last_date)
+        main(["100", "USD", "--to", "GBP", "--decimal", "--date", last_date])
+        expected = capsys.readouterr().out
+        # The whole history is not loaded without a date
+        monkeypatch.setattr(CurrencyConverter, "load_file", None)
+        main(["100", "USD", "--to", "GBP", "--decimal"])
+        assert capsys.readouterr().out == expected
+        assert expected.endswith(f" GBP on {last_date}\n")
+
+    def test_fallback_to_history(self, capsys):
+        main(["100", "CYP"])  # no recent rate
+        assert capsys.readouterr().out.endswith(" EUR on 2007-12-31\n")
+
+
+class TestArrayStorage:
+    def test_table(self):
+        assert a0._table.shape == (
+            1 + (a0.bounds["EUR"].last_date - a0.bounds["EUR"].first_date).days,
+            len(a0.currencies),
+        )
+        assert a0._table[:, a0._columns["EUR"]] == approx(1)
+
+    def test_rates_view(self):
+        assert date(2014, 3, 28) in a0._rates["USD"]
+        assert date(1986, 2, 2) not in a0._rates["USD"]
+        assert a0._rates["USD"][date(2014, 3, 28)] == approx(1.3759)
+        assert a0._rates["BGN"][date(2010, 11, 21)] is None
+
+    def test_convert_many(self):
+        amounts = [10, 10, 10, 10]
+        currencies = ["EUR", "USD", "BGN", "AAA"]
+        dates = [date(2014, 3, 28), date(2014, 3, 28), date(2010, 11, 21), None]
+        result = a0.convert_many(amounts, currencies, "EUR", dates)
+        assert result.mask.tolist() == [False, False, True, True]
+        assert result[0] == approx(10)
+        assert result[1] == approx(c0.convert(10, "USD", "EUR", date(2014, 3, 28)))
+
+    def test_convert_many_broadcasting(self):
+        result = a0.convert_many([10, 20], "EUR", "USD", date(2014, 3, 28))
+        assert result.tolist() == approx([13.759, 27.518])
+
+    def test_convert_many_latest_date(self):
+        result = a0.convert_many([10], ["USD"], ["JPY"])
+        assert result[0] == approx(a0.convert(10, "USD", "JPY"))
+
+    @pytest.mark.parametrize("c", [a2, a3, a4])
+    def test_convert_many_fallbacks(self, c):
+        dates = [date(1986, 2, 2), date(2010, 11, 21)]
+        result = c.convert_many(10, ["USD", "BGN"], "EUR", dates)
+        assert not result.mask[0]
+        assert result[0] == approx(c.convert(10, "USD", "EUR", dates[0]))
+        if c.fallback_on_missing_rate:
+            assert result[1] == approx(c.convert(10, "BGN", "EUR", dates[1]))
+        else:
+            assert result.mask[1]
+
+    def test_convert_many_empty(self):
+        result = a0.convert_many([], [], [])
+        assert result.shape == (0,)
+        assert result.count() == 0  # a masked array
+
+    def test_convert_many_wrong_date(self):
+        result = a0.convert_many(10, ["USD", "EUR"], "EUR", date(1986, 2, 2))
+        assert result.mask.tolist() == [True, False]
+
+    def test_decimal_not_supported(self):
+        with pytest.raises(ValueError):
+            ArrayCurrencyConverter(decimal=True)
+
+
+class TestSnapshot:
+    @pytest.fixture
+    def currency_file(self, tmp_path):
+        return str(shutil.copy(CURRENCY_FILE, tmp_path / "eurofxref-hist.zip"))
+
+    def test_snapshot_is_saved(self, currency_file, tmp_path):
+        c = ArrayCurrencyConverter(currency_file, snapshot=True)
+        assert len(list(tmp_path.glob("*.snapshot"))) == 1
+        assert c.convert(10, "EUR", "USD", date(2013, 3, 21)) == approx(12.91)
+
+    def test_snapshot_is_loaded(self, currency_file, monkeypatch):
+        c = ArrayCurrencyConverter(currency_file, snapshot=True)
+        monkeypatch.setattr(ArrayCurrencyConverter, "load_lines", None)
+        s = ArrayCurrencyConverter(currency_file, snapshot=True)
+        assert s.currencies == c.currencies
+        assert s.bounds == c.bounds
+        assert s.convert(10, "EUR", "USD", date(2013, 3, 21)) == approx(12.91)
+        with pytest.raises(RateNotFoundError):
+            s.convert(10, "BGN", date=date(2010, 11, 21))
+
+    def test_snapshot_per_options(self, currency_file, tmp_path):
+        ArrayCurrencyConverter(currency_file, snapshot=True)
+        c = ArrayCurrencyConverter(
+            currency_file, snapshot=True, fallback_on_missing_rate=True
+        )
+        assert len(list(tmp_path.glob("*.snapshot"))) == 2
+        assert c.convert(10, "BGN", date=date(2010, 11, 21)) == approx(5.112997238)
+
+    def test_mmap(self, currency_file):
+        for _ in range(2):  # build then load the snapshot
+            c = ArrayCurrencyConverter(currency_file, mmap=True)
+            assert c.snapshot
+            assert c._table.filename.endswith(".snapshot")
+            assert not c._table.flags.writeable
+            assert c.convert(10, "EUR", "USD", date(2013, 3, 21)) == approx(12.91)
+
+    def test_stale_snapshot_is_rebuilt(self, tmp_path):
+        currency_file = str(shutil.copy(SINGLE_DAY_CURRENCY_FILE, tmp_path))
+        c = ArrayCurrencyConverter(currency_file, snapshot=True)
+        assert c.currencies == SINGLE_DAY_CURRENCIES
+
+        with open(currency_file, "w") as f:
+            f.write(TestCustomObject.lines)
+        c = ArrayCurrencyConverter(currency_file, snapshot=True)
+        assert c.currencies == {"EUR", "USD", "AAA"}
+        assert len(list(tmp_path.glob("*.snapshot"))) == 1
+
+
+class TestUpdate:
+    update = """\
+    Date,USD,BBB,
+    2014-04-02,10,3"""
+
+    @pytest.fixture(params=[CurrencyConverter, ArrayCurrencyConverter])
+    def c(self, request):
+        c = request.param(
+            currency_file=None,
+            fallback_on_wrong_date=True,
+            fallback_on_missing_rate=True,
+        )
+        c.load_lines(StringIO(TestCustomObject.lines))
+        return c
+
+    def test_bounds_extended(self, c):
+        c.apply_update(StringIO(self.update))
+        assert c.currencies == {"EUR", "USD", "AAA", "BBB"}
+        assert c.bounds["USD"] == (date(2014, 3, 23), date(2014, 4, 2))
+        assert c.bounds["AAA"] == (date(2014, 3, 22), date(2014, 3, 27))
+        assert c.bounds["BBB"] == (date(2014, 4, 2), date(2014, 4, 2))
+        assert c.bounds["EUR"] == (date(2014, 3, 22), date(2014, 4, 2))
+
+    def test_gap_filled(self, c):
+        c.apply_update(StringIO(self.update))
+        assert c.convert(10, "EUR", "USD", date(2014, 4, 2)) == approx(100)
+        assert c.convert(10, "EUR", "BBB", date(2014, 4, 2)) == approx(30)
+        # Interpolated between 2 (2014-03-29) and 10 (2014-04-02)
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 31)) == approx(60)
+        # Loaded rates are kept
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 28)) == approx(40)
+        assert c.convert(10, "EUR", "USD", date(2015, 1, 1)) == approx(100)
+
+    def test_gap_filled_with_last_known(self):
+        c = CurrencyConverter(
+            currency_file=None,
+            fallback_on_missing_rate=True,
+            fallback_on_missing_rate_method="last_known",
+        )
+        c.load_lines(StringIO(TestCustomObject.lines))
+        c.apply_update(StringIO(self.update))
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 31)) == approx(20)
+
+    def test_rates_within_bounds(self, c):
+        c.apply_update(StringIO("Date,USD\n2014-03-25,10\n2014-03-29,4"))
+        assert c.bounds["USD"] == (date(2014, 3, 23), date(2014, 3, 29))
+        # Interpolated again around the new rates, between 18, 10, 6 and 4
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 24)) == approx(140)
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 26)) == approx(80)
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 28)) == approx(50)
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 29)) == approx(40)
+
+    def test_older_rates(self, c):
+        c.apply_update(StringIO("Date,USD\n2014-03-20,2"))
+        assert c.bounds["USD"] == (date(2014, 3, 20), date(2014, 3, 29))
+        assert c.convert(10, "EUR", "USD", date(2014, 3, 22)) == approx(380 / 3)
+
+    def test_merge_file(self, tmp_path):
+        currency_file = tmp_path / "eurofxref.csv"
+        currency_file.write_text("Date, USD, JPY, \n2 January 2099, 1.5, 150, \n")
+        c = CurrencyConverter(fallback_on_missing_rate=True)
+        c.merge_file(str(currency_file))
+        assert c.bounds["USD"].last_date == date(2099, 1, 2)
+        assert c.convert(10, "EUR", "JPY", date(2099, 1, 2)) == approx(1500)
+        assert c.convert(10, "EUR", "USD", date(2013, 3, 21)) == approx(12.91)
+
+
 @pytest.mark.parametrize(
     "c",
     [
         CurrencyConverter(SINGLE_DAY_ECB_URL),
         CurrencyConverter(SINGLE_DAY_CURRENCY_FILE),
+        ArrayCurrencyConverter(SINGLE_DAY_CURRENCY_FILE),
     ],
 )
 def test_single_day_sources(c):